@@ -1,14 +1,33 @@
 from django.contrib import admin
 
-from .models import Comment, Follow, Group, Post
+from .models import Comment, Follow, Group, Job, Post
+from .pagination import EstimatedCountPaginator
+from .search import search_ids
+
+ADMIN_SEARCH_LIMIT = 1000
 
 
 class PostAdmin(admin.ModelAdmin):
-    list_display = ("pk", "text", "pub_date", "author")
+    list_display = ("pk", "text", "pub_date", "author", "comments_count")
     search_fields = ("text",)
     list_filter = ("pub_date",)
+    list_select_related = ("author",)
+    date_hierarchy = "pub_date"
+    autocomplete_fields = ("author", "group")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = "-пусто-"
 
+    def get_search_results(self, request, queryset, search_term):
+        # Вместо LIKE по всей таблице ищем по полнотекстовому индексу,
+        # ограничившись ADMIN_SEARCH_LIMIT лучшими совпадениями.
+        if not search_term:
+            return queryset, False
+        ids = [pk for pk, _ in search_ids(
+            search_term, limit=ADMIN_SEARCH_LIMIT
+        )]
+        return queryset.filter(pk__in=ids), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ("pk", "title", "slug", "description")
@@ -20,12 +39,29 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ("pk", "text", "created", "author", "post")
     search_fields = ("text",)
     list_filter = ("created",)
+    list_select_related = ("author", "post")
+    autocomplete_fields = ("author",)
+    raw_id_fields = ("post",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = "-пусто-"
 
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = ("pk", "user", "author")
-    list_filter = ("user",)
+    search_fields = ("user__username", "author__username")
+    list_select_related = ("user", "author")
+    autocomplete_fields = ("user", "author")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = "-пусто-"
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("pk", "task", "status", "attempts", "run_at", "locked_by")
+    search_fields = ("task",)
+    list_filter = ("status",)
+    readonly_fields = ("created",)
     empty_value_display = "-пусто-"
 
 
@@ -33,3 +69,4 @@ admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
 admin.site.register(Follow, FollowAdmin)
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,72 @@
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _lock_cache():
+    # Блокировки идут мимо локального уровня двухуровневого кэша:
+    # им нужна атомарность общего бэкенда, а снятие блокировки
+    # не должно сбрасывать локальные кэши всех процессов.
+    return getattr(cache, 'shared', cache)
+
+
+def _is_fresh(computed_in, expires_at, beta):
+    """Вероятностное досрочное обновление (XFetch).
+
+    Чем ближе срок и чем дольше пересчёт, тем вероятнее, что
+    запрос возьмётся обновить значение заранее.
+    """
+    early = computed_in * beta * -math.log(1 - random.random())
+    return time.time() + early < expires_at
+
+
+def get_or_compute(key, compute, timeout, fallback_key=None,
+                   beta=None, lease=None):
+    """Читает значение из кэша, пересчитывая его одним процессом.
+
+    Значение хранится дольше timeout на STAMPEDE_STALE_TIMEOUT секунд:
+    пока один процесс пересчитывает его под блокировкой с коротким
+    сроком аренды, остальные получают устаревшую копию. fallback_key
+    хранит последнюю копию для ключей, которые меняются при
+    инвалидации. Если compute вернул None, ничего не кэшируется.
+    """
+    beta = settings.STAMPEDE_BETA if beta is None else beta
+    lease = settings.STAMPEDE_LEASE if lease is None else lease
+    entry = cache.get(key)
+    if entry is not None:
+        value, computed_in, expires_at = entry
+        if _is_fresh(computed_in, expires_at, beta):
+            return value
+        stale = value
+    else:
+        stale = cache.get(fallback_key) if fallback_key else None
+
+    lock_key = f'lock:{key}'
+    locks = _lock_cache()
+    if not locks.add(lock_key, 1, lease):
+        if stale is not None:
+            return stale
+        deadline = time.monotonic() + lease
+        while time.monotonic() < deadline:
+            time.sleep(settings.STAMPEDE_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+        return compute()
+
+    try:
+        started = time.time()
+        value = compute()
+        if value is not None:
+            computed_in = time.time() - started
+            hard_timeout = timeout + settings.STAMPEDE_STALE_TIMEOUT
+            data = {key: (value, computed_in, time.time() + timeout)}
+            if fallback_key:
+                data[fallback_key] = value
+            cache.set_many(data, hard_timeout)
+        return value
+    finally:
+        locks.delete(lock_key)
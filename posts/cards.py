@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .thumbnails import prefetch
+
+CARD_TEMPLATE = 'includes/post_item.html'
+
+
+def viewer_class(post, user):
+    """Карточка выглядит по-разному только для этих трёх групп."""
+    if not user.is_authenticated:
+        return 'anonymous'
+    if user.pk == post.author_id:
+        return 'owner'
+    return 'authenticated'
+
+
+def card_key(post, user):
+    created = int(post.pub_date.timestamp() * 10 ** 6)
+    return (
+        f'post_card:{post.pk}:{created}:{post.version}:'
+        f'{viewer_class(post, user)}'
+    )
+
+
+def render_cards(posts, user):
+    """HTML карточек записей; готовые берутся из кэша одним get_many.
+
+    Версия записи растёт при редактировании и изменении комментариев,
+    поэтому устаревшие карточки просто перестают запрашиваться.
+    Миниатюры для недостающих карточек ищутся одним проходом.
+    """
+    posts = list(posts)
+    keys = [card_key(post, user) for post in posts]
+    cached = cache.get_many(keys)
+    prefetch([
+        post for post, key in zip(posts, keys) if key not in cached
+    ])
+    rendered = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        card = cached.get(key)
+        if card is None:
+            card = render_to_string(
+                CARD_TEMPLATE, {'post': post, 'user': user}
+            )
+            rendered[key] = card
+        cards.append(mark_safe(card))
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+    return cards
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Comment
+from .pagination import InvalidCursor, decode_cursor, encode_cursor
+
+
+class CommentPage:
+    """Порция комментариев с курсором на следующую."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _after(comments, cursor):
+    created, pk = cursor
+    return comments.filter(
+        Q(created__gt=created) | Q(created=created, pk__gt=pk)
+    )
+
+
+def comment_page(post_id, cursor=None, per_page=None):
+    """Комментарии записи от старых к новым, начиная после курсора.
+
+    Порция читается по индексу (post, created) вместе с авторами
+    одним запросом; лишняя строка в нём показывает, есть ли
+    продолжение. Время не зависит от числа комментариев.
+    """
+    per_page = per_page or settings.COMMENTS_PER_PAGE
+    comments = (
+        Comment.objects.filter(post_id=post_id)
+        .select_related('author')
+        .order_by('created', 'pk')
+    )
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        after = None
+    if after is not None:
+        comments = _after(comments, after)
+    rows = list(comments[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1], date_field='created')
+    # Страница остаётся QuerySet с уже заполненным кэшем: шаблон
+    # и контекст получают QuerySet, а в базу повторно никто не ходит.
+    page = comments[:per_page]
+    page._result_cache = rows
+    return CommentPage(page, next_cursor)
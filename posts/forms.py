@@ -1,6 +1,9 @@
 from django import forms
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from .images import normalize_upload, validate_size
 from .models import Comment, Post
 
 
@@ -9,6 +12,26 @@ class PostForm(ModelForm):
         model = Post
         fields = ('group', 'text', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Файл сверх лимита LimitedUploadHandler оставляет пустым, и
+        # ImageField сообщил бы о битом изображении. Такой файл не
+        # отдаём полю, а отклоняем по размеру в clean_image.
+        self.oversized = None
+        image = self.files.get('image')
+        if image is not None and image.size > settings.POST_IMAGE_MAX_BYTES:
+            self.files = self.files.copy()
+            self.files.pop('image')
+            self.oversized = image
+
+    def clean_image(self):
+        if self.oversized is not None:
+            validate_size(self.oversized)
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return normalize_upload(image)
+        return image
+
 
 class CommentForm(ModelForm):
     class Meta():
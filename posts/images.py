@@ -0,0 +1,145 @@
+import base64
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from PIL import Image, ImageOps
+
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'PNG': {'optimize': True},
+    'GIF': {},
+    'WEBP': {'quality': 90},
+}
+
+# Форматы, которые Pillow уменьшает ещё при декодировании (draft).
+DRAFT_FORMATS = ('JPEG',)
+
+
+class LimitedUploadHandler(TemporaryFileUploadHandler):
+    """Перестаёт сохранять файл, как только он больше POST_IMAGE_MAX_BYTES.
+
+    Остаток файла дочитывается из запроса, но на диск не пишется.
+    Форма получает пустой файл с настоящим размером, и validate_upload
+    отклоняет его, не открывая.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received <= settings.POST_IMAGE_MAX_BYTES:
+            return super().receive_data_chunk(raw_data, start)
+        if self.file.tell():
+            self.file.seek(0)
+            self.file.truncate()
+        return None
+
+
+def read_header(file_):
+    """Формат и размеры изображения из заголовка, без декодирования."""
+    file_.seek(0)
+    try:
+        with Image.open(file_) as image:
+            return image.format, image.size
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Не удалось прочитать изображение', code='invalid_image'
+        )
+    finally:
+        file_.seek(0)
+
+
+def validate_size(file_):
+    max_bytes = settings.POST_IMAGE_MAX_BYTES
+    if file_.size > max_bytes:
+        raise ValidationError(
+            'Файл больше %(limit)s МБ',
+            code='file_too_large',
+            params={'limit': max_bytes // (1024 * 1024)},
+        )
+
+
+def validate_upload(file_):
+    validate_size(file_)
+    format_name, (width, height) = read_header(file_)
+    limit = settings.POST_IMAGE_MAX_PIXELS
+    if format_name not in DRAFT_FORMATS:
+        limit = min(limit, settings.POST_IMAGE_MAX_DECODED_PIXELS)
+    if width * height > limit:
+        raise ValidationError(
+            'Изображение %(width)s×%(height)s слишком большое',
+            code='too_many_pixels',
+            params={'width': width, 'height': height},
+        )
+
+
+def normalize_upload(file_):
+    """Проверяет и пересохраняет загруженное изображение.
+
+    Размеры сверяются с лимитами по заголовку до декодирования.
+    Большие JPEG уменьшаются до POST_IMAGE_MAX_SIDE ещё при
+    декодировании (draft); остальные форматы декодируются целиком,
+    поэтому для них действует меньший POST_IMAGE_MAX_DECODED_PIXELS.
+    Поворот из EXIF применяется к пикселям, метаданные, кроме
+    цветового профиля, не сохраняются. Анимированные изображения
+    остаются как есть.
+    """
+    validate_upload(file_)
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    with Image.open(file_) as image:
+        if getattr(image, 'is_animated', False):
+            file_.seek(0)
+            return file_
+        format_name = image.format
+        image.thumbnail((max_side, max_side), reducing_gap=2.0)
+        image = ImageOps.exif_transpose(image)
+    name = file_.name
+    if format_name not in SAVE_OPTIONS:
+        format_name = 'PNG'
+        name = os.path.splitext(name)[0] + '.png'
+    if format_name == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    options = dict(SAVE_OPTIONS[format_name])
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(output, format_name, **options)
+    size = output.tell()
+    output.seek(0)
+    return UploadedFile(output, name, Image.MIME.get(format_name), size)
+
+
+def make_placeholder(file_):
+    """Крошечная копия изображения в виде data URI.
+
+    Показывается размытым фоном, пока браузер грузит миниатюру.
+    JPEG декодируется в режиме draft сразу в уменьшенном масштабе.
+    """
+    size = settings.POST_IMAGE_PLACEHOLDER_SIZE
+    file_.seek(0)
+    try:
+        with Image.open(file_) as image:
+            image.draft('RGB', (size * 4, size * 4))
+            image = image.convert('RGB')
+            image.thumbnail((size, size))
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=40)
+    finally:
+        file_.seek(0)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def set_placeholder(post):
+    post.image_placeholder = (
+        make_placeholder(post.image.file) if post.image else ''
+    )
@@ -0,0 +1,205 @@
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import Error, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class Task:
+    """Функция, которую можно выполнить в фоне через delay()."""
+
+    def __init__(self, func, name=None, max_attempts=None):
+        self.func = func
+        self.name = name or f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return enqueue(
+            self.name, *args, max_attempts=self.max_attempts, **kwargs
+        )
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """Регистрирует функцию как фоновую задачу.
+
+        @task(max_attempts=3)
+        def send_digest(user_id):
+            ...
+
+        send_digest.delay(user.pk)
+
+    Аргументы сохраняются в JSON, поэтому передавайте id, а не объекты.
+    """
+    def decorator(func):
+        registered = Task(func, name=name, max_attempts=max_attempts)
+        _registry[registered.name] = registered
+        return registered
+    return decorator(func) if func is not None else decorator
+
+
+def get_task(name):
+    # Задачи регистрируются при импорте модуля; обработчик мог его
+    # ещё не импортировать, поэтому имя по умолчанию — путь до функции.
+    if name not in _registry:
+        found = import_string(name)
+        if not isinstance(found, Task):
+            raise LookupError(f'{name} не зарегистрирована как задача')
+        _registry[name] = found
+    return _registry[name]
+
+
+def enqueue(name, *args, max_attempts=None, **kwargs):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Задача станет видна обработчикам только после коммита, а при
+    откате исчезнет вместе с остальными изменениями.
+    """
+    return Job.objects.create(
+        task=name,
+        payload=json.dumps(
+            {'args': args, 'kwargs': kwargs}, cls=DjangoJSONEncoder
+        ),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def worker_name():
+    return (
+        f'{socket.gethostname()}:{os.getpid()}:'
+        f'{threading.current_thread().name}'
+    )[:100]
+
+
+def _ready(now):
+    return Job.objects.filter(
+        Q(locked_until__isnull=True) | Q(locked_until__lt=now),
+        status=Job.QUEUED,
+        run_at__lte=now,
+    ).order_by('run_at', 'pk')
+
+
+def claim(worker, limit=1):
+    """Забирает до limit готовых задач и возвращает их.
+
+    На PostgreSQL строки блокируются FOR UPDATE SKIP LOCKED, и
+    параллельные обработчики не ждут друг друга. В SQLite записи
+    и так идут по очереди, поэтому каждая задача захватывается
+    условным UPDATE: его выполнит только один обработчик. Захват
+    ограничен сроком JOBS_LEASE — задачу упавшего процесса потом
+    заберёт другой.
+    """
+    now = timezone.now()
+    lock = {
+        'locked_by': worker,
+        'locked_until': now + timedelta(seconds=settings.JOBS_LEASE),
+        'attempts': F('attempts') + 1,
+    }
+    ready = _ready(now)
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                ready.select_for_update(skip_locked=True)
+                .values_list('pk', flat=True)[:limit]
+            )
+            Job.objects.filter(pk__in=ids).update(**lock)
+    else:
+        ids = [
+            pk for pk in ready.values_list('pk', flat=True)[:limit]
+            if ready.filter(pk=pk).update(**lock)
+        ]
+    return list(Job.objects.filter(pk__in=ids, locked_by=worker))
+
+
+def backoff(attempts):
+    """Пауза перед повтором: удваивается с каждой неудачей."""
+    return min(
+        settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+        settings.JOBS_RETRY_MAX_DELAY,
+    )
+
+
+def _fail(job, error):
+    changes = {'locked_by': '', 'locked_until': None, 'last_error': error}
+    if job.attempts >= job.max_attempts:
+        changes['status'] = Job.FAILED
+        logger.error('Задача %s отменена после %s попыток', job, job.attempts)
+    else:
+        changes['run_at'] = timezone.now() + timedelta(
+            seconds=backoff(job.attempts)
+        )
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(**changes)
+
+
+def run(job):
+    """Выполняет захваченную задачу; возвращает True при успехе.
+
+    Успешная задача удаляется из очереди, неудачная откладывается
+    по backoff или, если попытки кончились, остаётся в состоянии
+    failed для разбора.
+    """
+    if job.attempts > job.max_attempts:
+        _fail(job, job.last_error or 'Истёк срок захвата')
+        return False
+    try:
+        payload = json.loads(job.payload)
+        get_task(job.task)(*payload['args'], **payload['kwargs'])
+    except Exception as error:
+        logger.exception('Задача %s завершилась ошибкой', job)
+        _fail(job, f'{type(error).__name__}: {error}')
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).delete()
+    return True
+
+
+def work(stop=None, burst=False, poll_interval=None):
+    """Цикл обработчика: забирает и выполняет задачи по одной.
+
+    С burst=True выходит, когда очередь опустела; иначе ждёт новые
+    задачи, пока не установлен stop.
+    """
+    stop = stop or threading.Event()
+    if poll_interval is None:
+        poll_interval = settings.JOBS_POLL_INTERVAL
+    worker = worker_name()
+    done = 0
+    while not stop.is_set():
+        # Как между запросами: разорванное или устаревшее соединение
+        # закрывается, и следующий запрос откроет новое. Внутри
+        # транзакции (например, тестовой) закрывать его нельзя.
+        if not connection.in_atomic_block:
+            close_old_connections()
+        try:
+            jobs = claim(worker)
+            if not jobs:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+                continue
+            for job in jobs:
+                done += run(job)
+        except Error:
+            # «database is locked» в SQLite при нескольких обработчиках,
+            # обрыв соединения: попробуем снова после паузы. Задачу,
+            # которую не удалось отметить, заберут по истечении захвата.
+            logger.exception('Ошибка базы в обработчике задач')
+            stop.wait(poll_interval)
+    return done
@@ -0,0 +1,395 @@
+import logging
+import random
+import re
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max, Min
+from django.test import Client
+from django.urls import reverse
+
+from .models import Group, Post, User
+from .seeding import WORDS
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_POSTS = 500
+
+# Число запросов к базе из заголовка Server-Timing (MetricsMiddleware).
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries')
+
+
+class Fixture:
+    """Пользователи, записи и группы базы, по которым ходят клиенты.
+
+    Записи выбираются случайно по всему диапазону id, а не только
+    свежие: страницы старых записей тоже открывают. Анонимным
+    клиентам пользователи не нужны, readers для них — [None].
+    """
+
+    def __init__(self, rnd, clients, anonymous=False):
+        if anonymous:
+            self.readers = [None]
+        else:
+            self.readers = list(
+                User.objects.filter(follower__isnull=False).distinct()
+                .order_by('pk')[:clients]
+            ) or list(User.objects.order_by('pk')[:clients])
+        if not self.readers:
+            raise ValueError('В базе нет пользователей; выполните seed')
+        bounds = Post.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            raise ValueError('В базе нет записей; выполните seed')
+        ids = [
+            rnd.randint(bounds['first'], bounds['last'])
+            for _ in range(SAMPLE_POSTS)
+        ]
+        self.posts = list(
+            Post.objects.filter(pk__in=ids).order_by('pk')
+            .values_list('pk', 'author__username')
+        )
+        self.authors = sorted({username for _, username in self.posts})
+        self.groups = list(
+            Group.objects.order_by('pk').values_list('slug', flat=True)[:100]
+        )
+
+
+def text(rnd):
+    return ' '.join(rnd.choices(WORDS, k=rnd.randint(5, 20)))
+
+
+def post_kwargs(rnd, fixture):
+    post_id, username = rnd.choice(fixture.posts)
+    return {'username': username, 'post_id': post_id}
+
+
+def page(rnd):
+    return f'?page={rnd.randint(1, 5)}'
+
+
+# Сценарий получает случайный генератор и Fixture и возвращает
+# (метод, адрес, данные формы).
+SCENARIOS = {
+    'index': lambda rnd, fixture: (
+        'get', reverse('posts:index') + page(rnd), None
+    ),
+    'group_posts': lambda rnd, fixture: (
+        'get',
+        reverse('posts:group_posts', kwargs={
+            'slug': rnd.choice(fixture.groups)
+        }) + page(rnd),
+        None,
+    ),
+    'profile': lambda rnd, fixture: (
+        'get',
+        reverse('posts:profile', kwargs={
+            'username': rnd.choice(fixture.authors)
+        }),
+        None,
+    ),
+    'post': lambda rnd, fixture: (
+        'get', reverse('posts:post', kwargs=post_kwargs(rnd, fixture)), None
+    ),
+    'follow_index': lambda rnd, fixture: (
+        'get', reverse('posts:follow_index') + page(rnd), None
+    ),
+    'new_post': lambda rnd, fixture: (
+        'post', reverse('posts:new_post'), {'text': text(rnd)}
+    ),
+    'add_comment': lambda rnd, fixture: (
+        'post',
+        reverse('posts:add_comment', kwargs=post_kwargs(rnd, fixture)),
+        {'text': text(rnd)},
+    ),
+    'profile_follow': lambda rnd, fixture: (
+        'get',
+        reverse('posts:profile_follow', kwargs={
+            'username': rnd.choice(fixture.authors)
+        }),
+        None,
+    ),
+}
+
+WRITE_SCENARIOS = ('new_post', 'add_comment', 'profile_follow')
+
+# Без входа эти страницы только перенаправляют на форму входа.
+LOGIN_SCENARIOS = ('follow_index', *WRITE_SCENARIOS)
+
+
+def percentile(samples, percent):
+    """Перцентиль с линейной интерполяцией между соседними значениями."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    position = (len(ordered) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (
+        position - lower
+    )
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Перенаправления не выполняются, как и в тестовом клиенте."""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class RemoteResponse:
+    __slots__ = ('status_code', 'headers')
+
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+    def get(self, header, default=None):
+        return self.headers.get(header, default)
+
+
+class HttpClient:
+    """Клиент запущенного сервера по HTTP с интерфейсом тестового клиента.
+
+    Сессию создаёт force_login тестового клиента, поэтому сервер должен
+    работать с той же базой и тем же хранилищем сессий. После входа
+    клиент открывает форму новой записи, чтобы получить cookie CSRF:
+    настоящий сервер, в отличие от тестового клиента, его проверяет.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = SimpleCookie()
+        self.opener = urllib.request.build_opener(NoRedirect)
+
+    def force_login(self, user):
+        client = Client()
+        client.force_login(user)
+        name = settings.SESSION_COOKIE_NAME
+        self.cookies[name] = client.cookies[name].value
+        self.get(reverse('posts:new_post'))
+
+    def get(self, path, data=None):
+        return self.request('GET', path)
+
+    def post(self, path, data=None):
+        return self.request('POST', path, urlencode(data or {}).encode())
+
+    def request(self, method, path, body=None):
+        headers = {'Cookie': '; '.join(
+            f'{name}={morsel.value}' for name, morsel in self.cookies.items()
+        )}
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            csrf = self.cookies.get(settings.CSRF_COOKIE_NAME)
+            if csrf is not None:
+                headers['X-CSRFToken'] = csrf.value
+            headers['Referer'] = self.base_url + path
+        request = urllib.request.Request(
+            self.base_url + path, data=body, headers=headers, method=method
+        )
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                response.read()
+                status, headers = response.status, response.headers
+        except HTTPError as exc:
+            exc.read()
+            status, headers = exc.code, exc.headers
+        for cookie in headers.get_all('Set-Cookie') or []:
+            self.cookies.load(cookie)
+        return RemoteResponse(status, headers)
+
+
+def query_count(response):
+    """Запросы к базе из метрик тестового клиента или Server-Timing."""
+    metrics = getattr(response, 'metrics', None)
+    if metrics is not None:
+        return metrics.query_count
+    match = SERVER_TIMING_QUERIES.search(response.get('Server-Timing', ''))
+    return int(match.group(1)) if match else None
+
+
+class Sample:
+    __slots__ = ('latency', 'queries', 'error')
+
+    def __init__(self, latency, queries, error):
+        self.latency = latency
+        self.queries = queries
+        self.error = error
+
+
+def drive(scenario, fixture, reader, requests, warmup, seed, start,
+          base_url=None):
+    """Цикл одного клиента: вход, прогрев, ожидание старта и замеры.
+
+    При reader = None клиент остаётся анонимным, при base_url
+    запросы идут по HTTP на этот адрес. Возвращает замеры и моменты
+    начала и конца замеряемой части.
+    """
+    rnd = random.Random(seed)
+    client = Client() if base_url is None else HttpClient(base_url)
+    if reader is not None:
+        client.force_login(reader)
+    for _ in range(warmup):
+        request(client, scenario, rnd, fixture)
+    if start is not None:
+        start.wait()
+    began = time.perf_counter()
+    samples = [
+        request(client, scenario, rnd, fixture) for _ in range(requests)
+    ]
+    return samples, began, time.perf_counter()
+
+
+def request(client, scenario, rnd, fixture):
+    method, url, data = SCENARIOS[scenario](rnd, fixture)
+    started = time.perf_counter()
+    try:
+        response = getattr(client, method)(url, data)
+    except Exception:
+        logger.exception('%s: ошибка запроса %s', scenario, url)
+        return Sample(time.perf_counter() - started, None, True)
+    latency = time.perf_counter() - started
+    return Sample(
+        latency, query_count(response), response.status_code >= 400
+    )
+
+
+def run_scenario(scenario, fixture, clients, requests, warmup=0, seed=0,
+                 base_url=None):
+    """Прогоняет сценарий в clients параллельных клиентах.
+
+    Без base_url клиенты — тестовые клиенты Django в потоках этого
+    процесса, каждый со своим соединением с базой и своим
+    пользователем. Это измеряет код вью и базу без сети и веб-сервера;
+    из-за GIL вью делят одно ядро, поэтому rps растёт с clients, пока
+    ждут базу, а не Python. С base_url потоки только ждут ответов
+    запущенного сервера, и rps — это пропускная способность сервера
+    со всеми его процессами. Один клиент работает в текущем потоке.
+    """
+    shares = [
+        requests // clients + (index < requests % clients)
+        for index in range(clients)
+    ]
+    readers = [
+        fixture.readers[index % len(fixture.readers)]
+        for index in range(clients)
+    ]
+    if clients == 1:
+        samples, began, finished = drive(
+            scenario, fixture, readers[0], shares[0], warmup, seed, None,
+            base_url,
+        )
+        return summarize(samples, finished - began)
+
+    # Все клиенты начинают замеры одновременно, после входа и прогрева.
+    start = threading.Barrier(clients)
+
+    def loop(index):
+        try:
+            return drive(
+                scenario, fixture, readers[index], shares[index],
+                warmup, seed * 1000 + index, start, base_url,
+            )
+        except Exception:
+            start.abort()
+            raise
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(
+        max_workers=clients, thread_name_prefix='bench'
+    ) as pool:
+        runs = list(pool.map(loop, range(clients)))
+    samples = [sample for batch, _, _ in runs for sample in batch]
+    elapsed = (
+        max(finished for _, _, finished in runs)
+        - min(began for _, began, _ in runs)
+    )
+    return summarize(samples, elapsed)
+
+
+def summarize(samples, elapsed):
+    latencies = [sample.latency * 1000 for sample in samples]
+    queries = [
+        sample.queries for sample in samples if sample.queries is not None
+    ]
+    return {
+        'requests': len(samples),
+        'errors': sum(sample.error for sample in samples),
+        'rps': len(samples) / elapsed if elapsed else None,
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies, default=None),
+        },
+        'queries': {
+            'mean': sum(queries) / len(queries) if queries else None,
+            'max': max(queries, default=None),
+        },
+    }
+
+
+def run(scenarios, clients, requests, warmup=0, seed=0, anonymous=False,
+        base_url=None):
+    """Результаты по сценариям в виде, пригодном для JSON.
+
+    Анонимные клиенты пропускают сценарии из LOGIN_SCENARIOS,
+    group_posts пропускается, если в базе нет групп.
+    """
+    fixture = Fixture(random.Random(seed), clients, anonymous=anonymous)
+    results = {}
+    for scenario in scenarios:
+        if anonymous and scenario in LOGIN_SCENARIOS:
+            logger.warning('%s: нужен вход, сценарий пропущен', scenario)
+            continue
+        if scenario == 'group_posts' and not fixture.groups:
+            logger.warning('%s: в базе нет групп, сценарий пропущен',
+                           scenario)
+            continue
+        results[scenario] = run_scenario(
+            scenario, fixture, clients, requests, warmup=warmup, seed=seed,
+            base_url=base_url,
+        )
+    return results
+
+
+def regressions(baseline, results, tolerance):
+    """Ухудшения results относительно baseline.
+
+    Задержка p95 и rps сравниваются с допуском tolerance (доля),
+    среднее число запросов к базе — точно: оно не шумит.
+    """
+    found = []
+    for scenario, current in results.items():
+        previous = baseline.get(scenario)
+        if previous is None:
+            continue
+        old_p95 = previous['latency_ms']['p95']
+        new_p95 = current['latency_ms']['p95']
+        if old_p95 and new_p95 and new_p95 > old_p95 * (1 + tolerance):
+            found.append(
+                f'{scenario}: p95 {old_p95:.1f} → {new_p95:.1f} мс'
+            )
+        if (previous['rps'] and current['rps']
+                and current['rps'] < previous['rps'] * (1 - tolerance)):
+            found.append(
+                f'{scenario}: rps {previous["rps"]:.1f} → '
+                f'{current["rps"]:.1f}'
+            )
+        old_queries = previous['queries']['mean']
+        new_queries = current['queries']['mean']
+        if (old_queries is not None and new_queries is not None
+                and round(new_queries, 1) > round(old_queries, 1)):
+            found.append(
+                f'{scenario}: запросов к базе {old_queries:.1f} → '
+                f'{new_queries:.1f}'
+            )
+    return found
@@ -0,0 +1,88 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import transaction
+
+from posts import timeline
+from posts.feeds import PerAuthorFeed
+from posts.models import Follow, Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает способы чтения ленты подписок: соединение с Follow, '
+        'слияние лент авторов и материализованную ленту. Данные создаются '
+        'во временной транзакции и откатываются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--follows', type=int, nargs='+', default=[5, 20, 100],
+            help='Количество авторов в подписках',
+        )
+        parser.add_argument(
+            '--pages', type=int, nargs='+', default=[1, 10, 50],
+            help='Номера страниц ленты',
+        )
+        parser.add_argument('--posts-per-author', type=int, default=200)
+        parser.add_argument('--per-page', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"follows":>8} {"page":>6} {"join, ms":>10} '
+            f'{"merge, ms":>10} {"timeline, ms":>13}'
+        )
+        for follows in options['follows']:
+            with transaction.atomic():
+                reader = self.seed(follows, options['posts_per_author'])
+                strategies = (
+                    lambda: Post.objects.filter(
+                        author__following__user=reader
+                    ).select_related('author', 'group'),
+                    lambda: PerAuthorFeed(
+                        Follow.objects.filter(user=reader)
+                        .values_list('author_id', flat=True)
+                    ),
+                    lambda: timeline.FollowFeed(reader),
+                )
+                for page in options['pages']:
+                    timings = [
+                        self.measure(
+                            strategy, page,
+                            options['per_page'], options['repeat'],
+                        )
+                        for strategy in strategies
+                    ]
+                    self.stdout.write(
+                        f'{follows:>8} {page:>6} {timings[0]:>10.2f} '
+                        f'{timings[1]:>10.2f} {timings[2]:>13.2f}'
+                    )
+                transaction.set_rollback(True)
+
+    def seed(self, follows, posts_per_author):
+        reader = User.objects.create(username='bench_reader')
+        User.objects.bulk_create(
+            User(username=f'bench_author_{i}') for i in range(follows)
+        )
+        authors = User.objects.filter(username__startswith='bench_author_')
+        Post.objects.bulk_create(
+            Post(text=f'Запись {i}', author=author)
+            for author in authors
+            for i in range(posts_per_author)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for author in authors
+        )
+        timeline.rebuild(reader)
+        return reader
+
+    def measure(self, strategy, page, per_page, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(Paginator(strategy(), per_page).get_page(page))
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
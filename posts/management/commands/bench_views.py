@@ -0,0 +1,112 @@
+import json
+import platform
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import loadtest
+
+
+def number(value):
+    return '-' if value is None else f'{value:.1f}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает страницы и формы posts параллельными клиентами на '
+        'текущей базе и печатает p50/p95/p99, rps и запросы к базе. '
+        'Без --url вью вызываются в этом процессе, без сети и сервера. '
+        'Сценарии записи добавляют в базу записи, комментарии и подписки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=list(loadtest.SCENARIOS),
+            default=list(loadtest.SCENARIOS),
+        )
+        parser.add_argument(
+            '--read-only', action='store_true',
+            help='Пропустить сценарии записи',
+        )
+        parser.add_argument(
+            '--anonymous', action='store_true',
+            help='Клиенты без входа; сценарии, требующие входа, пропускаются',
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера с той же базой: запросы идут '
+                 'по HTTP, а не тестовым клиентом в этом процессе',
+        )
+        parser.add_argument('--clients', type=int, default=4)
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на сценарий от всех клиентов вместе',
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Незамеряемых запросов каждого клиента перед замером',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', help='Сохранить результаты в JSON-файл',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON прошлого прогона: ухудшения роняют команду',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.1,
+            help='Допустимое ухудшение p95 и rps, доля',
+        )
+
+    def handle(self, *args, **options):
+        scenarios = [
+            scenario for scenario in options['scenarios']
+            if not (options['read_only']
+                    and scenario in loadtest.WRITE_SCENARIOS)
+        ]
+        try:
+            results = loadtest.run(
+                scenarios, options['clients'], options['requests'],
+                warmup=options['warmup'], seed=options['seed'],
+                anonymous=options['anonymous'], base_url=options['url'],
+            )
+        except ValueError as exc:
+            raise CommandError(exc)
+        self.stdout.write(
+            f'{"scenario":<15} {"req":>6} {"err":>5} {"rps":>8} '
+            f'{"p50, ms":>9} {"p95, ms":>9} {"p99, ms":>9} {"queries":>8}'
+        )
+        for scenario, result in results.items():
+            latency = result['latency_ms']
+            self.stdout.write(
+                f'{scenario:<15} {result["requests"]:>6} '
+                f'{result["errors"]:>5} {number(result["rps"]):>8} '
+                f'{number(latency["p50"]):>9} {number(latency["p95"]):>9} '
+                f'{number(latency["p99"]):>9} '
+                f'{number(result["queries"]["mean"]):>8}'
+            )
+        if options['output']:
+            report = {
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'database': connection.vendor,
+                'url': options['url'],
+                'python': platform.python_version(),
+                'clients': options['clients'],
+                'requests': options['requests'],
+                'results': results,
+            }
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2, ensure_ascii=False)
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                previous = json.load(baseline)['results']
+            found = loadtest.regressions(
+                previous, results, options['tolerance']
+            )
+            for regression in found:
+                self.stdout.write(regression)
+            if found:
+                raise CommandError(f'Ухудшений: {len(found)}')
+            self.stdout.write('Ухудшений нет')
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from posts import plans
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными, открывает все страницы '
+        'posts и проверяет EXPLAIN их запросов на полные просмотры '
+        'и сортировки без индекса'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--analyze', action='store_true',
+            help='EXPLAIN ANALYZE на PostgreSQL: находит сортировки на диске',
+        )
+        parser.add_argument(
+            '--keep', action='store_true',
+            help='Не откатывать созданные данные',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            viewer, post = plans.seed(options['posts'])
+            client = Client()
+            client.force_login(viewer)
+            failures = plans.check_views(
+                client, post, analyze=options['analyze']
+            )
+            if not options['keep']:
+                transaction.set_rollback(True)
+        for name, sql, problems in failures:
+            self.stdout.write(f'{name}: {"; ".join(problems)}\n  {sql}')
+        if failures:
+            raise CommandError(f'Запросов с плохими планами: {len(failures)}')
+        self.stdout.write('Планы запросов в порядке')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает пользователей, группы, записи, комментарии и подписки '
+        'в JSONL по строке на объект, не держа данные в памяти; '
+        'файл .gz сжимается'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output')
+        parser.add_argument(
+            '--media', help='Каталог, куда скопировать изображения записей',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with transfer.open_file(options['output'], 'w') as output:
+            written = transfer.export(
+                output, media_dir=options['media'],
+                batch_size=options['batch_size'],
+            )
+        for name, total in written.items():
+            self.stdout.write(f'{name}: {total}')
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from posts import media, thumbnails
+from posts.models import Post, StoredFile
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет изображения записей и миниатюры, на которые больше '
+        'ничего не ссылается'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено',
+        )
+        parser.add_argument(
+            '--bloom', action='store_true',
+            help='Индекс ссылок в фильтре Блума вместо множества',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Не трогать файлы моложе стольких секунд',
+        )
+
+    def handle(self, *args, **options):
+        images, thumbs = media.build_index(
+            options['batch_size'], bloom=options['bloom']
+        )
+        targets = (
+            (
+                'изображений',
+                Post._meta.get_field('image').storage,
+                Post._meta.get_field('image').upload_to.rstrip('/'),
+                images,
+                thumbnails.delete,
+                media.in_use,
+            ),
+            (
+                'миниатюр',
+                default.storage,
+                thumbnail_settings.THUMBNAIL_PREFIX.rstrip('/'),
+                thumbs,
+                thumbnails.delete_thumbnail_file,
+                None,
+            ),
+        )
+        verb = 'Будет удалено' if options['dry_run'] else 'Удалено'
+        for label, storage, path, index, remove, in_use in targets:
+            count = size = 0
+            for name in media.find_orphans(
+                storage, path, index, options['min_age']
+            ):
+                # Индекс собран заранее: пока шёл обход, на файл могла
+                # сослаться новая запись с тем же содержимым.
+                if in_use is not None and in_use(name):
+                    continue
+                count += 1
+                size += storage.size(name)
+                if options['verbosity'] > 1:
+                    self.stdout.write(name)
+                if not options['dry_run']:
+                    remove(name)
+            self.stdout.write(
+                f'{verb} {label}: {count}, {size / 1024 / 1024:.1f} МБ'
+            )
+        if not options['dry_run']:
+            StoredFile.objects.filter(ref_count=0).delete()
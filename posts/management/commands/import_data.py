@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_data пачками; прерванная загрузка '
+        'продолжается с места остановки при повторном запуске'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input')
+        parser.add_argument(
+            '--media', help='Каталог с изображениями из выгрузки',
+        )
+        parser.add_argument(
+            '--state',
+            help='Файл состояния; по умолчанию <input>.state.json',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        importer = transfer.Importer(
+            options['input'],
+            state_path=options['state'],
+            media_dir=options['media'],
+            batch_size=options['batch_size'],
+        )
+        try:
+            inserted = importer.run()
+        except transfer.TransferError as exc:
+            raise CommandError(exc)
+        for name, total in inserted.items():
+            self.stdout.write(f'{name}: {total}')
+        self.stdout.write(
+            'Готово. Миниатюры загруженных изображений создаст '
+            'regenerate_thumbnails'
+        )
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from posts import media, page_cache
+from posts.models import Post, StoredFile
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит изображения записей из плоского каталога posts/ '
+        'в хранилище по хешу содержимого, пачками по ключу записи'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, сколько файлов будет перенесено',
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        moved = missing = 0
+        for names in self.batches(storage, options['batch_size']):
+            for name in names:
+                if not storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f'Нет файла: {name}')
+                    continue
+                if not options['dry_run']:
+                    self.move(storage, name)
+                moved += 1
+        if moved and not options['dry_run']:
+            page_cache.invalidate(page_cache.GLOBAL_SCOPE)
+        verb = 'Будет перенесено' if options['dry_run'] else 'Перенесено'
+        self.stdout.write(
+            f'{verb} файлов: {moved}, не найдено: {missing}. '
+            'Миниатюры перенесённых файлов создаст regenerate_thumbnails'
+        )
+
+    def batches(self, storage, batch_size):
+        last_pk = 0
+        while True:
+            rows = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .exclude(image='').exclude(image__isnull=True)
+                .order_by('pk')
+                .values_list('pk', 'image')[:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            yield sorted({
+                name for _, name in rows
+                if not storage.is_content_addressed(name)
+            })
+
+    def move(self, storage, name):
+        with storage.open(name) as file_:
+            new_name = storage.save(name, file_)
+        with transaction.atomic():
+            count = Post.objects.filter(image=name).update(
+                image=new_name, version=F('version') + 1
+            )
+            StoredFile.objects.filter(name=name).delete()
+            media.retain(new_name, count)
+        storage.delete(name)
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает индекс полнотекстового поиска по записям, '
+        'например после bulk_create или update в обход сигналов'
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_index()
+        self.stdout.write('Индекс поиска перестроен')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики записей и подписок пользователей с таблицами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options['usernames']:
+            users = users.filter(username__in=options['usernames'])
+        created, fixed = stats.reconcile(
+            users, batch_size=options['batch_size']
+        )
+        self.stdout.write(f'Создано: {created}, исправлено: {fixed}')
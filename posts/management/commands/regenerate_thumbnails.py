@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.core.management.base import BaseCommand
+
+from posts import page_cache, thumbnails
+from posts.images import make_placeholder
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры изображений записей параллельно '
+        'в нескольких процессах и заполняет недостающие заглушки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов; 0 — без пула, в текущем процессе',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать уже существующие миниатюры',
+        )
+
+    def handle(self, *args, **options):
+        generate = partial(thumbnails.generate, force=options['force'])
+        workers = options['workers']
+        if workers:
+            # Процессы запускаются через spawn: они не наследуют
+            # соединения с базой родителя и настраивают Django заново.
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+            run = pool.map
+        else:
+            pool = None
+            run = map
+        ready = failed = 0
+        try:
+            for rows in self.batches(options['batch_size']):
+                self.fill_placeholders(rows)
+                names = sorted({name for _, name, _ in rows})
+                results = list(run(generate, names))
+                done = [name for name, ok in zip(names, results) if ok]
+                thumbnails.bump_versions(done)
+                ready += len(done)
+                failed += len(names) - len(done)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        page_cache.invalidate(page_cache.GLOBAL_SCOPE)
+        self.stdout.write(f'Готово миниатюр: {ready}, ошибок: {failed}')
+
+    def batches(self, batch_size):
+        last_pk = 0
+        while True:
+            rows = list(
+                Post.objects.filter(pk__gt=last_pk)
+                .exclude(image='').exclude(image__isnull=True)
+                .order_by('pk')
+                .values_list('pk', 'image', 'image_placeholder')
+                [:batch_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            yield rows
+
+    def fill_placeholders(self, rows):
+        storage = Post._meta.get_field('image').storage
+        for pk, name, placeholder in rows:
+            if placeholder:
+                continue
+            try:
+                with storage.open(name) as file_:
+                    placeholder = make_placeholder(file_)
+            except (OSError, ValueError):
+                continue
+            Post.objects.filter(pk=pk).update(image_placeholder=placeholder)
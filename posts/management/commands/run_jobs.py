@@ -0,0 +1,79 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import jobs
+
+
+def work_in_threads(threads, burst, poll_interval, stop=None):
+    """Запускает threads циклов обработчика и ждёт их завершения."""
+    stop = stop or threading.Event()
+
+    def loop():
+        try:
+            return jobs.work(stop, burst=burst, poll_interval=poll_interval)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(
+        max_workers=threads, thread_name_prefix='jobs'
+    ) as pool:
+        futures = [pool.submit(loop) for _ in range(threads)]
+        try:
+            return sum(future.result() for future in futures)
+        except KeyboardInterrupt:
+            stop.set()
+            raise
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди в базе: '
+        'в нескольких процессах и потоках'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Число процессов; 1 — без пула, в текущем процессе',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Число потоков в каждом процессе',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Завершиться, когда очередь опустеет',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='Пауза между проверками пустой очереди, секунд',
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        work = (
+            options['threads'], options['burst'], options['poll_interval']
+        )
+        try:
+            if processes <= 1:
+                done = work_in_threads(*work)
+            else:
+                # Как и regenerate_thumbnails: spawn, чтобы процессы
+                # не унаследовали соединения с базой родителя.
+                with ProcessPoolExecutor(
+                    max_workers=processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=django.setup,
+                ) as pool:
+                    done = sum(pool.map(
+                        work_in_threads, *zip(*[work] * processes)
+                    ))
+        except KeyboardInterrupt:
+            self.stdout.write('Остановлено')
+            return
+        self.stdout.write(f'Выполнено задач: {done}')
@@ -0,0 +1,63 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.seeding import Seeder
+
+
+def moment(value):
+    return timezone.make_aware(datetime.fromisoformat(value))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, '
+        'записями, комментариями и подписками пакетной вставкой'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument(
+            '--comments', type=int, default=3000000,
+            help='Всего комментариев',
+        )
+        parser.add_argument(
+            '--follows', type=int, default=30,
+            help='Подписок на пользователя в среднем',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного закона активности авторов',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --until распределить записи',
+        )
+        parser.add_argument(
+            '--until', type=moment, default=None,
+            help='Дата последней записи, ISO 8601; по умолчанию сейчас',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        written = Seeder(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            seed=options['seed'],
+            alpha=options['alpha'],
+            days=options['days'],
+            until=options['until'],
+            batch_size=options['batch_size'],
+        ).run()
+        for name, total in written.items():
+            self.stdout.write(f'{name}: {total}')
+        self.stdout.write(f'Готово за {time.monotonic() - started:.1f} с')
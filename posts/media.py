@@ -0,0 +1,163 @@
+import hashlib
+import logging
+import math
+import posixpath
+from datetime import timedelta
+
+from django.core.exceptions import SuspiciousOperation
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import thumbnails
+from .models import Post, StoredFile
+
+logger = logging.getLogger(__name__)
+
+
+def retain(name, count=1):
+    """Добавляет ссылки на файл; строка счётчика создаётся при первой."""
+    updated = StoredFile.objects.filter(name=name).update(
+        ref_count=F('ref_count') + count
+    )
+    if not updated:
+        _, created = StoredFile.objects.get_or_create(
+            name=name, defaults={'ref_count': count}
+        )
+        if not created:
+            retain(name, count)
+
+
+def release(name):
+    """Убирает ссылку на файл и возвращает число оставшихся."""
+    StoredFile.objects.filter(name=name, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1
+    )
+    return (
+        StoredFile.objects.filter(name=name)
+        .values_list('ref_count', flat=True).first()
+    ) or 0
+
+
+def purge(name):
+    """Удаляет файл без ссылок вместе с его миниатюрами.
+
+    Строка счётчика удаляется только если ссылок всё ещё ноль:
+    за время до коммита тот же файл мог загрузить кто-то ещё.
+    Ошибки хранилища только логируются: остатки уберёт gc_media.
+    """
+    deleted, _ = StoredFile.objects.filter(name=name, ref_count=0).delete()
+    if not deleted:
+        return False
+    try:
+        thumbnails.delete(name)
+    except (OSError, SuspiciousOperation):
+        logger.exception('Не удалось удалить файл %s', name)
+    return True
+
+
+def release_and_purge(name):
+    """Убирает ссылку и после коммита удаляет файл, если она последняя."""
+    if release(name) == 0:
+        transaction.on_commit(lambda: purge(name))
+
+
+class BloomFilter:
+    """Множество строк фиксированного размера без ложных «нет».
+
+    На «есть ли элемент» иногда отвечает «да» ошибочно, с частотой
+    около error_rate при capacity элементах. Для сборки мусора это
+    безопасно: лишний файл останется, нужный не удалится.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        capacity = max(capacity, 1)
+        self.size = max(
+            8, int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'big')
+        step = int.from_bytes(digest[8:], 'big') | 1
+        return (
+            (first + i * step) % self.size for i in range(self.hashes)
+        )
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+def in_use(name):
+    """Ссылаются ли на изображение прямо сейчас запись или счётчик."""
+    return (
+        Post.objects.filter(image=name).exists()
+        or StoredFile.objects.filter(name=name, ref_count__gt=0).exists()
+    )
+
+
+def referenced_images(batch_size):
+    """Пачки имён изображений, на которые ссылаются записи."""
+    last_pk = 0
+    while True:
+        rows = list(
+            Post.objects.filter(pk__gt=last_pk)
+            .exclude(image='').exclude(image__isnull=True)
+            .order_by('pk')
+            .values_list('pk', 'image')[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+        yield sorted({name for _, name in rows})
+
+
+def build_index(batch_size, bloom=False):
+    """Индексы используемых исходников и их миниатюр."""
+    if bloom:
+        capacity = Post.objects.exclude(image='').count()
+        images = BloomFilter(capacity)
+        thumbs = BloomFilter(capacity * len(thumbnails.variants()))
+    else:
+        images, thumbs = set(), set()
+    for names in referenced_images(batch_size):
+        for name in names:
+            images.add(name)
+        for name in thumbnails.thumbnail_names(names):
+            thumbs.add(name)
+    return images, thumbs
+
+
+def walk(storage, path):
+    """Файлы каталога хранилища рекурсивно, по одному каталогу за раз."""
+    if not storage.exists(path):
+        return
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from walk(storage, posixpath.join(path, directory))
+
+
+def find_orphans(storage, path, index, min_age):
+    """Файлы без ссылок старше min_age секунд.
+
+    Свежие файлы пропускаются: запись, которая на них сошлётся,
+    может ещё не быть сохранена.
+    """
+    cutoff = timezone.now() - timedelta(seconds=min_age)
+    for name in walk(storage, path):
+        if name in index:
+            continue
+        if storage.get_modified_time(name) > cutoff:
+            continue
+        yield name
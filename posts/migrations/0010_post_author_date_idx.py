@@ -0,0 +1,52 @@
+from django.db import migrations, models
+
+# На PostgreSQL индекс строится CONCURRENTLY, чтобы не блокировать
+# запись в большую таблицу; для этого миграция идёт вне транзакции.
+# Состояние модели описывает обычный AddIndex.
+TABLE = 'posts_post'
+NAME = 'post_author_date_idx'
+COLUMNS = '("author_id", "pub_date" DESC)'
+
+
+def concurrently(schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return 'CONCURRENTLY '
+    return ''
+
+
+def create_index(apps, schema_editor):
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently(schema_editor)}IF NOT EXISTS '
+        f'"{NAME}" ON "{TABLE}" {COLUMNS}'
+    )
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute(
+        f'DROP INDEX {concurrently(schema_editor)}IF EXISTS "{NAME}"'
+    )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('posts', '0009_timelineentry'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_index, drop_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='post',
+                    index=models.Index(
+                        fields=['author', '-pub_date'],
+                        name='post_author_date_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Индекс полнотекстового поиска живёт вне модели Post, поэтому схема
+# создаётся вручную и зависит от СУБД. Содержимое индекса поддерживают
+# обработчики сигналов (posts.signals) и команда rebuild_search_index.
+FORWARD = {
+    'postgresql': [
+        'ALTER TABLE posts_post ADD COLUMN search_vector tsvector',
+        "UPDATE posts_post SET search_vector = "
+        "to_tsvector('russian', coalesce(text, ''))",
+        'CREATE INDEX posts_post_search_idx ON posts_post '
+        'USING GIN (search_vector)',
+    ],
+    'sqlite': [
+        'CREATE VIRTUAL TABLE posts_post_fts USING fts5('
+        "text, tokenize = 'unicode61 remove_diacritics 2')",
+        'INSERT INTO posts_post_fts (rowid, text) '
+        'SELECT id, text FROM posts_post',
+    ],
+}
+
+BACKWARD = {
+    'postgresql': ['ALTER TABLE posts_post DROP COLUMN search_vector'],
+    'sqlite': ['DROP TABLE posts_post_fts'],
+}
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(FORWARD), run(BACKWARD)),
+    ]
@@ -0,0 +1,52 @@
+from django.db import migrations, models
+
+# На PostgreSQL индекс строится CONCURRENTLY, чтобы не блокировать
+# запись в большую таблицу; для этого миграция идёт вне транзакции.
+# Состояние модели описывает обычный AddIndex.
+TABLE = 'posts_comment'
+NAME = 'comment_post_created_idx'
+COLUMNS = '("post_id", "created")'
+
+
+def concurrently(schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return 'CONCURRENTLY '
+    return ''
+
+
+def create_index(apps, schema_editor):
+    schema_editor.execute(
+        f'CREATE INDEX {concurrently(schema_editor)}IF NOT EXISTS '
+        f'"{NAME}" ON "{TABLE}" {COLUMNS}'
+    )
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute(
+        f'DROP INDEX {concurrently(schema_editor)}IF EXISTS "{NAME}"'
+    )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('posts', '0017_job'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_index, drop_index),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='comment',
+                    index=models.Index(
+                        fields=['post', 'created'],
+                        name='comment_post_created_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
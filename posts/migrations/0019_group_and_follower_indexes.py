@@ -0,0 +1,62 @@
+from django.db import migrations, models
+
+# На PostgreSQL индексы строятся CONCURRENTLY, чтобы не блокировать
+# запись в большие таблицы; для этого миграция идёт вне транзакции.
+# Состояние моделей описывают обычные AddIndex.
+INDEXES = [
+    ('posts_post', 'post_group_date_idx', '("group_id", "pub_date" DESC)'),
+    ('posts_follow', 'follow_author_user_idx', '("author_id", "user_id")'),
+]
+
+
+def concurrently(schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        return 'CONCURRENTLY '
+    return ''
+
+
+def create_indexes(apps, schema_editor):
+    for table, name, columns in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX {concurrently(schema_editor)}IF NOT EXISTS '
+            f'"{name}" ON "{table}" {columns}'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    for _, name, _ in INDEXES:
+        schema_editor.execute(
+            f'DROP INDEX {concurrently(schema_editor)}IF EXISTS "{name}"'
+        )
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('posts', '0018_comment_post_created_idx'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(create_indexes, drop_indexes),
+            ],
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='post',
+                    index=models.Index(
+                        fields=['group', '-pub_date'],
+                        name='post_group_date_idx'
+                    ),
+                ),
+                migrations.AddIndex(
+                    model_name='follow',
+                    index=models.Index(
+                        fields=['author', 'user'],
+                        name='follow_author_user_idx'
+                    ),
+                ),
+            ],
+        ),
+    ]
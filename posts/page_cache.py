@@ -0,0 +1,215 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from yatube.cache import is_process_local
+
+from .caching import get_or_compute
+from .models import Group, User
+
+GLOBAL_SCOPE = 'all'
+GROUPS_SCOPE = 'groups'
+
+
+def index_scopes():
+    return ['index']
+
+
+def group_scopes(slug):
+    return [GROUPS_SCOPE, f'group:{slug}']
+
+
+def profile_scopes(username):
+    return [f'profile:{username}']
+
+
+def post_scopes(username, post_id):
+    # Правка записи и её комментарии сбрасывают область профиля автора.
+    return profile_scopes(username)
+
+
+def _generation_key(scope):
+    return f'page_gen:{scope}'
+
+
+def _changed_key(scope):
+    return f'page_changed:{scope}'
+
+
+def _new_generation():
+    # Стартуем со времени, чтобы после вытеснения счётчика из кэша
+    # не вернуться к уже использованным номерам поколений.
+    return int(time.time() * 1000)
+
+
+def scope_state(scopes):
+    """Поколения областей и время их последнего изменения.
+
+    Оба значения читаются одним get_many.
+    """
+    scopes = [GLOBAL_SCOPE, *scopes]
+    generation_keys = [_generation_key(scope) for scope in scopes]
+    changed_keys = [_changed_key(scope) for scope in scopes]
+    values = cache.get_many(generation_keys + changed_keys)
+    missing = {}
+    now = time.time()
+    for generation_key, changed_key in zip(generation_keys, changed_keys):
+        if generation_key not in values:
+            missing[generation_key] = _new_generation()
+            missing[changed_key] = now
+        elif changed_key not in values:
+            # Ключи вытесняются по отдельности. Время изменения берём
+            # текущим: лишний 200 лучше ложного 304.
+            missing[changed_key] = now
+    if missing:
+        cache.set_many(missing, None)
+        values.update(missing)
+    return (
+        [values[key] for key in generation_keys],
+        max(values[key] for key in changed_keys),
+    )
+
+
+def generations(scopes):
+    return scope_state(scopes)[0]
+
+
+def invalidate(*scopes):
+    """Сбрасывает все закэшированные страницы указанных областей."""
+    for scope in scopes:
+        key = _generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), None)
+    now = time.time()
+    cache.set_many({_changed_key(scope): now for scope in scopes}, None)
+
+
+def invalidate_post_pages(post, all_groups=False):
+    """Сбрасывает ленты, на которых показывается запись.
+
+    all_groups нужен при правке: группа записи могла смениться.
+    """
+    scopes = index_scopes() + profile_scopes(
+        User.objects.filter(pk=post.author_id)
+        .values_list('username', flat=True).first()
+    )
+    if all_groups:
+        scopes.append(GROUPS_SCOPE)
+    elif post.group_id is not None:
+        scopes += group_scopes(
+            Group.objects.filter(pk=post.group_id)
+            .values_list('slug', flat=True).first()
+        )
+    invalidate(*scopes)
+
+
+def enabled():
+    """Можно ли кэшировать страницы и отвечать 304.
+
+    Поколения областей должны видеть все процессы приложения. Если
+    общий кэш живёт в памяти процесса, запись в одном процессе не
+    сбросит страницы другого, и тот будет отдавать их устаревшими
+    до PAGE_CACHE_TIMEOUT. Исключение — PAGE_CACHE_SINGLE_PROCESS.
+    """
+    return settings.PAGE_CACHE_SINGLE_PROCESS or not is_process_local()
+
+
+def _path_hash(request):
+    return hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+
+def page_key(request, scopes):
+    versions = '.'.join(str(value) for value in generations(scopes))
+    return f'page:{_path_hash(request)}:{versions}'
+
+
+def cache_anonymous_page(get_scopes):
+    """Кэширует страницу целиком для анонимных посетителей.
+
+    get_scopes получает аргументы вью и возвращает области, от которых
+    зависит страница. Страница живёт до изменения любой из них:
+    обработчики сигналов вызывают invalidate, и следующий запрос
+    получает новый ключ. Новую версию строит один процесс, остальные
+    на это время получают предыдущую.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated
+                    or not enabled()):
+                return view(request, *args, **kwargs)
+            rendered = None
+
+            def render():
+                nonlocal rendered
+                rendered = view(request, *args, **kwargs)
+                if (rendered.status_code == 200
+                        and not rendered.streaming
+                        and not rendered.cookies):
+                    return rendered.content, rendered['Content-Type']
+                return None
+
+            cached = get_or_compute(
+                page_key(request, get_scopes(*args, **kwargs)),
+                render,
+                settings.PAGE_CACHE_TIMEOUT,
+                fallback_key=f'page_last:{_path_hash(request)}',
+            )
+            if rendered is not None:
+                return rendered
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+        return wrapper
+    return decorator
+
+
+def _state(request, get_scopes, args, kwargs):
+    if not hasattr(request, '_page_state'):
+        request._page_state = scope_state(get_scopes(*args, **kwargs))
+    return request._page_state
+
+
+def conditional_page(get_scopes):
+    """Отвечает 304 на If-None-Match и If-Modified-Since.
+
+    Валидаторы строятся по поколениям областей страницы из кэша,
+    поэтому проверка не трогает базу и не рендерит шаблоны. ETag
+    учитывает зрителя и CSRF-cookie: закэшированная у клиента форма
+    должна оставаться рабочей.
+    """
+    def etag(request, *args, **kwargs):
+        versions, _ = _state(request, get_scopes, args, kwargs)
+        viewer = request.user.pk if request.user.is_authenticated else 'anon'
+        source = ':'.join(str(part) for part in (
+            request.get_full_path(),
+            *versions,
+            viewer,
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        ))
+        return hashlib.md5(source.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        _, changed = _state(request, get_scopes, args, kwargs)
+        return datetime.fromtimestamp(changed, tz=timezone.utc)
+
+    conditional = condition(etag_func=etag, last_modified_func=last_modified)
+
+    def decorator(view):
+        checked = conditional(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if enabled():
+                return checked(request, *args, **kwargs)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
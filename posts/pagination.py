@@ -0,0 +1,220 @@
+import datetime as dt
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(obj, date_field='pub_date'):
+    """Курсор — микросекунды pub_date от эпохи и id записи."""
+    delta = getattr(obj, date_field) - EPOCH
+    microseconds = (
+        (delta.days * 86400 + delta.seconds) * 10 ** 6 + delta.microseconds
+    )
+    return f'{microseconds}_{obj.pk}'
+
+
+def decode_cursor(value):
+    try:
+        microseconds, pk = value.split('_')
+        pub_date = EPOCH + dt.timedelta(microseconds=int(microseconds))
+        return pub_date, int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        raise InvalidCursor(value)
+
+
+def seek_filter(queryset, before=None, after=None,
+                date_field='pub_date', pk_field='pk'):
+    """Ограничивает queryset строками по одну сторону курсора.
+
+    Для after строки упорядочены от курсора к новым, иначе — к старым.
+    """
+    if after is not None:
+        pub_date, pk = after
+        return queryset.filter(
+            Q(**{f'{date_field}__gt': pub_date})
+            | Q(**{date_field: pub_date, f'{pk_field}__gt': pk})
+        ).order_by(date_field, pk_field)
+    if before is not None:
+        pub_date, pk = before
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__lt': pub_date})
+            | Q(**{date_field: pub_date, f'{pk_field}__lt': pk})
+        )
+    return queryset.order_by(f'-{date_field}', f'-{pk_field}')
+
+
+def seek_queryset(queryset, before=None, after=None, limit=None,
+                  date_field='pub_date', pk_field='pk'):
+    """Читает не более limit строк по ту или другую сторону курсора.
+
+    Строки всегда возвращаются от новых к старым; для after — те,
+    что ближе всего к курсору.
+    """
+    rows = list(seek_filter(
+        queryset, before=before, after=after,
+        date_field=date_field, pk_field=pk_field,
+    )[:limit])
+    if after is not None:
+        rows.reverse()
+    return rows
+
+
+class KeysetPage:
+    """Страница ленты без COUNT(*) и OFFSET.
+
+    Повторяет ту часть интерфейса django.core.paginator.Page,
+    которой пользуются шаблоны.
+    """
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def next_cursor(self):
+        if self.has_next() and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous() and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return None
+
+
+class KeysetPaginator:
+    """Постраничный вывод по ключу (pub_date, id).
+
+    ?before=<cursor> — записи старше курсора, ?after=<cursor> — новее.
+    Каждая страница — это диапазонное чтение по индексу pub_date
+    с LIMIT per_page + 1, лишняя строка говорит о наличии продолжения.
+    Кроме QuerySet принимает ленты с методом seek(before, after, limit).
+    """
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+
+    def seek(self, before=None, after=None):
+        limit = self.per_page + 1
+        seek = getattr(self.object_list, 'seek', None)
+        if seek is not None:
+            return seek(before=before, after=after, limit=limit)
+        return seek_queryset(
+            self.object_list, before=before, after=after, limit=limit
+        )
+
+    def page(self, before=None, after=None):
+        rows = self.seek(before=before, after=after)
+        has_more = len(rows) > self.per_page
+        if after is not None:
+            object_list = rows[-self.per_page:] if has_more else rows
+            return KeysetPage(object_list, self, True, has_more)
+        return KeysetPage(
+            rows[:self.per_page], self, has_more, before is not None
+        )
+
+    def get_page(self, before=None, after=None):
+        """Как Paginator.get_page: битый курсор открывает первую страницу."""
+        try:
+            before = decode_cursor(before) if before else None
+            after = decode_cursor(after) if after else None
+        except InvalidCursor:
+            before = after = None
+        return self.page(before=before, after=after)
+
+
+def use_keyset(request):
+    return (
+        settings.KEYSET_PAGINATION
+        or 'before' in request.GET
+        or 'after' in request.GET
+    )
+
+
+def paginate(request, object_list, per_page=None):
+    """Возвращает страницу ленты для запроса.
+
+    По умолчанию — обычный Paginator с номером страницы в ?page=,
+    в режиме курсоров — KeysetPaginator.
+    """
+    per_page = per_page or settings.PER_PAGE
+    if use_keyset(request):
+        return KeysetPaginator(object_list, per_page).get_page(
+            before=request.GET.get('before'),
+            after=request.GET.get('after'),
+        )
+    paginator = Paginator(object_list, per_page)
+    return paginator.get_page(request.GET.get('page'))
+
+
+def estimated_count(queryset):
+    """Оценка числа строк таблицы из статистики PostgreSQL.
+
+    Возвращает None, если оценка неприменима: запрос с условиями,
+    другая СУБД или таблица ещё не анализировалась.
+    """
+    if not isinstance(queryset, QuerySet) or queryset.query.where:
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator без COUNT(*) по всей большой таблице.
+
+    Для QuerySet без условий берёт оценку из статистики, если она не
+    меньше ESTIMATED_COUNT_THRESHOLD; иначе считает строки точно.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list)
+        if (estimate is not None
+                and estimate >= settings.ESTIMATED_COUNT_THRESHOLD):
+            return estimate
+        return super().count
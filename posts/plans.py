@@ -0,0 +1,155 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.urls import reverse
+
+from . import urls
+from .models import User
+from .seeding import WORDS, Seeder
+
+BIG_TABLES = ('posts_post', 'posts_comment', 'posts_follow')
+
+# Вью, которые меняют данные даже на GET.
+SKIP_VIEWS = ('profile_follow', 'profile_unfollow')
+
+SEARCH_QUERY = WORDS[0]
+
+# COUNT(*) без условий нужен нумерованным страницам главной ленты и
+# читает индекс целиком при любых индексах; PostgreSQL делает это
+# Index Only Scan, а админка вместо него берёт оценку из статистики.
+UNFILTERED_COUNT_RE = re.compile(
+    r'^SELECT COUNT\(\*\) AS "__count" FROM "\w+"$'
+)
+
+SQLITE_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?(\w+)(.*)$')
+SQLITE_SEARCH_RE = re.compile(r'^SEARCH (?:TABLE )?(\w+)')
+
+
+def seed(posts):
+    """Синтетические данные для проверки планов.
+
+    Возвращает самого активного автора (у него есть и подписки)
+    и его запись в группе.
+    """
+    Seeder(
+        users=max(posts // 50, 2), groups=10, posts=posts,
+        comments=posts * 3, follows=20,
+    ).run()
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for table in BIG_TABLES:
+                cursor.execute(f'ANALYZE {table}')
+    viewer = (
+        User.objects.filter(posts__group__isnull=False, follower__isnull=False)
+        .order_by('-stats__posts_count', 'pk').first()
+    )
+    return viewer, viewer.posts.filter(group__isnull=False).first()
+
+
+class QueryCapture:
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip().upper().startswith('SELECT'):
+            self.queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def view_urls(post):
+    """Адреса всех вью posts.urls для записи post и её автора."""
+    values = {
+        'username': post.author.username,
+        'post_id': post.pk,
+        'slug': post.group.slug,
+    }
+    for pattern in urls.urlpatterns:
+        if pattern.name in SKIP_VIEWS:
+            continue
+        url = reverse(f'{urls.app_name}:{pattern.name}', kwargs={
+            name: values[name] for name in pattern.pattern.converters
+        })
+        if pattern.name == 'search':
+            url += f'?q={SEARCH_QUERY}'
+        yield pattern.name, url
+
+
+def capture_views(client, post):
+    """SQL, который выполняют вью при открытии с холодным кэшем."""
+    for name, url in view_urls(post):
+        cache.clear()
+        capture = QueryCapture()
+        with connection.execute_wrapper(capture):
+            client.get(url)
+        yield name, capture.queries
+
+
+def sqlite_problems(sql, details):
+    problems = []
+    for detail in details:
+        match = SQLITE_SCAN_RE.match(detail)
+        if match is None or match.group(1) not in BIG_TABLES:
+            continue
+        table, rest = match.groups()
+        # Обход индекса с LIMIT — это чтение первых строк по порядку.
+        if 'INDEX' in rest and ' LIMIT ' in sql:
+            continue
+        problems.append(f'полный просмотр {table}: {detail}')
+    touches_big = any(
+        (SQLITE_SCAN_RE.match(detail) or SQLITE_SEARCH_RE.match(detail))
+        and re.split(r'\s+', detail)[1] in BIG_TABLES
+        for detail in details
+    )
+    if touches_big and any(
+            'USE TEMP B-TREE FOR ORDER BY' in detail for detail in details):
+        problems.append('сортировка без индекса')
+    return problems
+
+
+def postgres_problems(plan):
+    problems = []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        nodes.extend(node.get('Plans', []))
+        if (node['Node Type'] == 'Seq Scan'
+                and node.get('Relation Name') in BIG_TABLES):
+            problems.append(f'Seq Scan по {node["Relation Name"]}')
+        if node.get('Sort Space Type') == 'Disk':
+            problems.append(f'сортировка на диске: {node.get("Sort Key")}')
+    return problems
+
+
+def explain(sql, params, analyze=False):
+    """Проблемы плана запроса; пустой список — план в порядке.
+
+    На PostgreSQL последовательное чтение запрещено настройкой сеанса:
+    если Seq Scan всё равно остался, подходящего индекса нет, и это
+    видно даже на небольших данных. Сортировку на диске показывает
+    только EXPLAIN ANALYZE.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            options = 'ANALYZE, FORMAT JSON' if analyze else 'FORMAT JSON'
+            with transaction.atomic():
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN ({options}) {sql}', params)
+                return postgres_problems(cursor.fetchone()[0])
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return sqlite_problems(sql, [row[-1] for row in cursor])
+    return []
+
+
+def check_views(client, post, analyze=False):
+    """Список (вью, SQL, проблемы) для запросов с плохими планами."""
+    failures = []
+    for name, queries in capture_views(client, post):
+        for sql, params in queries:
+            if UNFILTERED_COUNT_RE.match(sql):
+                continue
+            problems = explain(sql, params, analyze=analyze)
+            if problems:
+                failures.append((name, sql, problems))
+    return failures
@@ -0,0 +1,219 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Post
+
+WORD_RE = re.compile(r'\w+')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(rank, pk):
+    return f'{rank!r}_{pk}'
+
+
+def decode_cursor(value):
+    try:
+        rank, pk = value.rsplit('_', 1)
+        return float(rank), int(pk)
+    except (AttributeError, ValueError):
+        raise InvalidCursor(value)
+
+
+class PostgresSearch:
+    """tsvector-колонка search_vector с GIN-индексом, конфигурация russian.
+
+    Колонку модель не описывает: её создаёт миграция 0014, а заполняют
+    обработчики сигналов Post.
+    """
+
+    def rebuild(self, cursor, ids=None):
+        sql = (
+            "UPDATE posts_post SET search_vector = "
+            "to_tsvector('russian', coalesce(text, ''))"
+        )
+        if ids is None:
+            cursor.execute(sql)
+        else:
+            cursor.execute(sql + ' WHERE id BETWEEN %s AND %s', ids)
+
+    def index(self, cursor, post):
+        cursor.execute(
+            "UPDATE posts_post SET search_vector = "
+            "to_tsvector('russian', coalesce(text, '')) WHERE id = %s",
+            [post.pk]
+        )
+
+    def remove(self, cursor, post_id):
+        pass
+
+    def search(self, cursor, query, after, limit):
+        rank = "ts_rank(search_vector, plainto_tsquery('russian', %s))"
+        sql = (
+            f'SELECT id, {rank} AS rank FROM posts_post '
+            f"WHERE search_vector @@ plainto_tsquery('russian', %s)"
+        )
+        params = [query, query]
+        if after is not None:
+            sql += (
+                f' AND ({rank} < %s::real '
+                f'OR ({rank} = %s::real AND id < %s))'
+            )
+            params += [query, after[0], query, after[0], after[1]]
+        sql += ' ORDER BY rank DESC, id DESC LIMIT %s'
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+class SqliteSearch:
+    """Отдельная таблица FTS5 для локального запуска.
+
+    Токенизатор unicode61 без стемминга; ранг — bm25 со знаком минус,
+    чтобы больший ранг, как и в PostgreSQL, означал лучшее совпадение.
+    """
+
+    def rebuild(self, cursor, ids=None):
+        if ids is None:
+            cursor.execute('DELETE FROM posts_post_fts')
+            cursor.execute(
+                'INSERT INTO posts_post_fts (rowid, text) '
+                'SELECT id, text FROM posts_post'
+            )
+            return
+        cursor.execute(
+            'DELETE FROM posts_post_fts WHERE rowid BETWEEN %s AND %s', ids
+        )
+        cursor.execute(
+            'INSERT INTO posts_post_fts (rowid, text) '
+            'SELECT id, text FROM posts_post WHERE id BETWEEN %s AND %s', ids
+        )
+
+    def index(self, cursor, post):
+        self.remove(cursor, post.pk)
+        cursor.execute(
+            'INSERT INTO posts_post_fts (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text]
+        )
+
+    def remove(self, cursor, post_id):
+        cursor.execute(
+            'DELETE FROM posts_post_fts WHERE rowid = %s', [post_id]
+        )
+
+    def search(self, cursor, query, after, limit):
+        words = WORD_RE.findall(query)
+        if not words:
+            return []
+        match = ' '.join(f'"{word}"' for word in words)
+        sql = (
+            'SELECT rowid, -bm25(posts_post_fts) AS rank '
+            'FROM posts_post_fts WHERE posts_post_fts MATCH %s'
+        )
+        params = [match]
+        if after is not None:
+            sql += (
+                ' AND (-bm25(posts_post_fts) < %s '
+                'OR (-bm25(posts_post_fts) = %s AND rowid < %s))'
+            )
+            params += [after[0], after[0], after[1]]
+        sql += ' ORDER BY rank DESC, rowid DESC LIMIT %s'
+        cursor.execute(sql, params + [limit])
+        return cursor.fetchall()
+
+
+class BasicSearch:
+    """Поиск подстроки без индекса для остальных СУБД; ранг у всех нулевой."""
+
+    def rebuild(self, cursor, ids=None):
+        pass
+
+    def index(self, cursor, post):
+        pass
+
+    def remove(self, cursor, post_id):
+        pass
+
+    def search(self, cursor, query, after, limit):
+        posts = Post.objects.filter(text__icontains=query)
+        if after is not None:
+            posts = posts.filter(pk__lt=after[1])
+        return [
+            (pk, 0.0) for pk in
+            posts.order_by('-pk').values_list('pk', flat=True)[:limit]
+        ]
+
+
+BACKENDS = {
+    'postgresql': PostgresSearch,
+    'sqlite': SqliteSearch,
+}
+
+
+def get_backend(vendor=None):
+    return BACKENDS.get(vendor or connection.vendor, BasicSearch)()
+
+
+def index_post(post):
+    with connection.cursor() as cursor:
+        get_backend().index(cursor, post)
+
+
+def remove_post(post_id):
+    with connection.cursor() as cursor:
+        get_backend().remove(cursor, post_id)
+
+
+def rebuild_index(ids=None):
+    """Перестраивает индекс всех записей или записей с id в [first, last]."""
+    with connection.cursor() as cursor:
+        get_backend().rebuild(cursor, ids)
+
+
+def search_ids(query, after=None, limit=None):
+    """Пары (id, rank) найденных записей, лучшие совпадения первыми."""
+    limit = limit or settings.PER_PAGE
+    with connection.cursor() as cursor:
+        return get_backend().search(cursor, query, after, limit)
+
+
+class SearchPage:
+    """Страница результатов поиска с курсором на следующую."""
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def search_page(query, cursor=None, per_page=None):
+    per_page = per_page or settings.PER_PAGE
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except InvalidCursor:
+        after = None
+    rows = search_ids(query, after=after, limit=per_page + 1)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [pk for pk, _ in rows]
+    )
+    return SearchPage(
+        [posts[pk] for pk, _ in rows if pk in posts], next_cursor
+    )
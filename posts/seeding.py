@@ -0,0 +1,347 @@
+import bisect
+import itertools
+import random
+from array import array
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import page_cache, search
+from .models import (Comment, Follow, Group, Post, TimelineEntry, User,
+                     UserStats)
+
+WORDS = (
+    'день вечер город дорога книга музыка море лес река дом окно свет '
+    'утро ночь весна лето осень зима друг работа путь мысль история '
+    'новый старый тихий яркий долгий быстрый сегодня вчера снова очень'
+).split()
+
+COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'
+})
+
+
+class CopyFile:
+    """Файлоподобный поток строк для COPY ... FROM STDIN."""
+
+    def __init__(self, rows):
+        self.lines = (self.format(row) for row in rows)
+        self.buffer = ''
+
+    @staticmethod
+    def value(value):
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        return str(value).translate(COPY_ESCAPES)
+
+    def format(self, row):
+        return '\t'.join(self.value(value) for value in row) + '\n'
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            line = next(self.lines, None)
+            if line is None:
+                break
+            self.buffer += line
+        if size < 0:
+            size = len(self.buffer)
+        chunk, self.buffer = self.buffer[:size], self.buffer[size:]
+        return chunk
+
+    readline = read
+
+
+def write_rows(model, fields, rows, batch_size):
+    """Вставляет кортежи значений полей fields; возвращает число строк.
+
+    На PostgreSQL строки уходят одним COPY, на остальных СУБД —
+    executemany пачками по batch_size. Модели и их save() не
+    участвуют, поэтому auto_now_add не перезаписывает даты.
+    """
+    table = model._meta.db_table
+    columns = [model._meta.get_field(name).column for name in fields]
+    quoted = ', '.join(connection.ops.quote_name(name) for name in columns)
+    counted = RowCounter(rows)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(table)} ({quoted}) '
+                f'FROM STDIN',
+                CopyFile(counted),
+                size=1 << 16,
+            )
+        else:
+            sql = (
+                f'INSERT INTO {connection.ops.quote_name(table)} '
+                f'({quoted}) VALUES ({", ".join(["%s"] * len(columns))})'
+            )
+            adapt = connection.ops.adapt_datetimefield_value
+            while True:
+                batch = [
+                    [adapt(value) if hasattr(value, 'tzinfo') else value
+                     for value in row]
+                    for row in itertools.islice(counted, batch_size)
+                ]
+                if not batch:
+                    break
+                cursor.executemany(sql, batch)
+    return counted.total
+
+
+class RowCounter:
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.total = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self.rows)
+        self.total += 1
+        return row
+
+
+def next_id(model):
+    return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+
+class PowerLaw:
+    """Выбор индекса 0..n-1 с вероятностью ~ 1 / rank ** alpha.
+
+    Ранги случайно перемешаны, чтобы активность не зависела от id.
+    """
+
+    def __init__(self, rnd, n, alpha):
+        # array, а не list: на десятках миллионов записей это разница
+        # между сотнями мегабайт и гигабайтами.
+        ranks = array('L', range(n))
+        rnd.shuffle(ranks)
+        self.cumulative = array('d', itertools.accumulate(
+            1 / (rank + 1) ** alpha for rank in ranks
+        ))
+        self.rnd = rnd
+
+    def choice(self):
+        point = self.rnd.random() * self.cumulative[-1]
+        return bisect.bisect(self.cumulative, point)
+
+
+class Seeder:
+    """Генерирует согласованный набор данных заданного размера.
+
+    Один и тот же seed даёт те же данные относительно until. Счётчики
+    записей, подписок и комментариев считаются при генерации, лента
+    подписок и поисковый индекс собираются в конце: сигналы при
+    такой вставке не работают.
+    """
+
+    def __init__(self, users, groups, posts, comments, follows, seed=0,
+                 alpha=1.2, days=365, until=None, batch_size=5000):
+        self.rnd = random.Random(seed)
+        self.counts = {
+            'users': users, 'groups': groups, 'posts': posts,
+            'comments': comments, 'follows': follows,
+        }
+        self.alpha = alpha
+        self.until = until or timezone.now()
+        self.since = self.until - timedelta(days=days)
+        self.batch_size = batch_size
+        self.written = {}
+
+    def run(self):
+        with transaction.atomic():
+            self.user_base = next_id(User)
+            self.group_base = next_id(Group)
+            self.post_base = next_id(Post)
+            users = self.counts['users']
+            self.posts_count = array('L', [0]) * users
+            self.followers_count = array('L', [0]) * users
+            self.following_count = array('L', [0]) * users
+            self.authors = PowerLaw(self.rnd, users, self.alpha)
+            self.write('users', User, [
+                'id', 'password', 'is_superuser', 'username', 'first_name',
+                'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+            ], self.user_rows())
+            self.write('groups', Group, [
+                'id', 'title', 'slug', 'description',
+            ], self.group_rows())
+            self.comment_counts = self.draw_comment_counts()
+            self.write('posts', Post, [
+                'id', 'text', 'pub_date', 'author', 'group', 'image',
+                'image_placeholder', 'comments_count', 'version',
+            ], self.post_rows())
+            self.write('comments', Comment, [
+                'post', 'author', 'text', 'created',
+            ], self.comment_rows())
+            self.write('follows', Follow, [
+                'user', 'author',
+            ], self.follow_rows())
+            self.write('stats', UserStats, [
+                'user', 'posts_count', 'followers_count', 'following_count',
+            ], self.stats_rows())
+            self.reset_sequences()
+            self.written['timeline'] = fill_timeline(
+                self.user_base, self.user_base + users - 1
+            )
+            posts = self.counts['posts']
+            if posts:
+                search.rebuild_index(
+                    (self.post_base, self.post_base + posts - 1)
+                )
+        page_cache.invalidate(page_cache.GLOBAL_SCOPE)
+        return self.written
+
+    def write(self, name, model, fields, rows):
+        self.written[name] = write_rows(model, fields, rows, self.batch_size)
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [User, Group, Post, Comment, Follow]
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def user_rows(self):
+        for index in range(self.counts['users']):
+            pk = self.user_base + index
+            joined = self.since + timedelta(
+                seconds=self.rnd.random() * 86400
+            )
+            yield (
+                pk, '!', False, f'seed_{pk}', '', '', '', False, True,
+                joined,
+            )
+
+    def group_rows(self):
+        for index in range(self.counts['groups']):
+            pk = self.group_base + index
+            yield (
+                pk, f'Группа {pk}', f'seed-{pk}',
+                ' '.join(self.rnd.choices(WORDS, k=12)),
+            )
+
+    def draw_comment_counts(self):
+        # Тяжёлый хвост: у немногих записей много комментариев.
+        posts = self.counts['posts']
+        counts = array('L', [0]) * posts
+        if not posts:
+            return counts
+        popular = PowerLaw(self.rnd, posts, self.alpha)
+        for _ in range(self.counts['comments']):
+            counts[popular.choice()] += 1
+        return counts
+
+    def post_rows(self):
+        posts = self.counts['posts']
+        step = (self.until - self.since) / max(posts, 1)
+        groups = self.counts['groups']
+        for index in range(posts):
+            author = self.authors.choice()
+            self.posts_count[author] += 1
+            group = None
+            if groups and self.rnd.random() < 0.7:
+                group = self.group_base + self.rnd.randrange(groups)
+            yield (
+                self.post_base + index,
+                ' '.join(self.rnd.choices(WORDS, k=self.rnd.randint(5, 40))),
+                self.since + step * index,
+                self.user_base + author,
+                group,
+                '',
+                '',
+                self.comment_counts[index],
+                0,
+            )
+
+    def comment_rows(self):
+        users = self.counts['users']
+        step = (self.until - self.since) / max(self.counts['posts'], 1)
+        for index, total in enumerate(self.comment_counts):
+            pub_date = self.since + step * index
+            window = (self.until - pub_date).total_seconds()
+            created = sorted(
+                self.rnd.random() * window for _ in range(total)
+            )
+            for seconds in created:
+                yield (
+                    self.post_base + index,
+                    self.user_base + self.rnd.randrange(users),
+                    ' '.join(self.rnd.choices(WORDS, k=8)),
+                    pub_date + timedelta(seconds=seconds),
+                )
+
+    def follow_rows(self):
+        users = self.counts['users']
+        average = min(self.counts['follows'], users - 1)
+        if average <= 0:
+            return
+        popular = PowerLaw(self.rnd, users, self.alpha)
+        for user in range(users):
+            wanted = min(
+                int(self.rnd.expovariate(1 / average)) + 1, users - 1
+            )
+            authors = set()
+            for _ in range(wanted * 3):
+                author = popular.choice()
+                if author != user:
+                    authors.add(author)
+                if len(authors) == wanted:
+                    break
+            for author in sorted(authors):
+                self.followers_count[author] += 1
+                self.following_count[user] += 1
+                yield self.user_base + user, self.user_base + author
+
+    def stats_rows(self):
+        for index in range(self.counts['users']):
+            yield (
+                self.user_base + index,
+                self.posts_count[index],
+                self.followers_count[index],
+                self.following_count[index],
+            )
+
+
+def fill_timeline(first, last):
+    """Последние TIMELINE_BACKFILL записей каждого автора из подписок.
+
+    То же, что собрал бы timeline.rebuild для подписчиков с id от first
+    до last, но одним INSERT ... SELECT. Подписки и авторы берутся из
+    того же диапазона; авторы с подписчиками сверх
+    TIMELINE_FANOUT_LIMIT, как и в timeline, пропускаются.
+    """
+    qn = connection.ops.quote_name
+    sql = f'''
+        INSERT INTO {qn(TimelineEntry._meta.db_table)}
+            (user_id, post_id, pub_date)
+        SELECT f.user_id, p.id, p.pub_date
+        FROM {qn(Follow._meta.db_table)} f
+        JOIN (
+            SELECT id, author_id, pub_date, ROW_NUMBER() OVER (
+                PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+            ) AS position
+            FROM {qn(Post._meta.db_table)}
+            WHERE author_id BETWEEN %s AND %s
+        ) p ON p.author_id = f.author_id
+        WHERE f.user_id BETWEEN %s AND %s
+            AND p.position <= %s
+            AND f.author_id IN (
+                SELECT author_id FROM {qn(Follow._meta.db_table)}
+                WHERE author_id BETWEEN %s AND %s
+                GROUP BY author_id HAVING COUNT(*) <= %s
+            )
+    '''
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [
+            first, last, first, last, settings.TIMELINE_BACKFILL,
+            first, last, settings.TIMELINE_FANOUT_LIMIT,
+        ])
+        return cursor.rowcount
@@ -0,0 +1,169 @@
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import media, page_cache, search, stats, timeline
+from .models import Comment, Follow, Group, Post, User
+
+
+# Счётчики обновляются раньше лент: лента решает, популярен ли
+# автор, по UserStats, и если строки ещё нет, get_stats соберёт её
+# по таблицам уже с новой записью.
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, posts_count=1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def bump_post_version(sender, instance, created, **kwargs):
+    if not created:
+        Post.objects.filter(pk=instance.pk).update(version=F('version') + 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    stats.increment(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_index(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+def _saves_image(update_fields):
+    return update_fields is None or 'image' in update_fields
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_image(sender, instance, update_fields, **kwargs):
+    instance._previous_image = ''
+    if not instance._state.adding and _saves_image(update_fields):
+        instance._previous_image = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('image', flat=True).first()
+        ) or ''
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, update_fields, **kwargs):
+    if not _saves_image(update_fields):
+        return
+    previous = getattr(instance, '_previous_image', '')
+    current = instance.image.name or ''
+    if previous == current:
+        return
+    if current:
+        media.retain(current)
+    if previous:
+        media.release_and_purge(previous)
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    if instance.image:
+        media.release_and_purge(instance.image.name)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, followers_count=1)
+        stats.increment(instance.user_id, following_count=1)
+
+
+@receiver(post_save, sender=Follow)
+def add_author_to_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    stats.increment(instance.author_id, followers_count=-1)
+    stats.increment(instance.user_id, following_count=-1)
+
+
+@receiver(post_delete, sender=Follow)
+def remove_author_from_timeline(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+    timeline.author_unfollowed(instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1,
+            version=F('version') + 1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    Post.objects.filter(pk=instance.post_id).update(
+        comments_count=F('comments_count') - 1,
+        version=F('version') + 1
+    )
+
+
+@receiver(post_save, sender=Post)
+def invalidate_pages_on_post_save(sender, instance, created, **kwargs):
+    page_cache.invalidate_post_pages(instance, all_groups=not created)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_pages_on_post_delete(sender, instance, **kwargs):
+    page_cache.invalidate_post_pages(instance)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_pages_on_comment(sender, instance, **kwargs):
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        page_cache.invalidate_post_pages(post)
+
+
+@receiver(post_save, sender=Group)
+def bump_group_post_versions(sender, instance, created, **kwargs):
+    # Карточки записей показывают название и адрес группы.
+    if not created:
+        Post.objects.filter(group=instance).update(version=F('version') + 1)
+
+
+@receiver(pre_delete, sender=Group)
+def bump_versions_before_group_delete(sender, instance, **kwargs):
+    # SET_NULL обнуляет group_id одним UPDATE без сигналов Post.
+    Post.objects.filter(group=instance).update(version=F('version') + 1)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_pages_on_group(sender, instance, **kwargs):
+    page_cache.invalidate(page_cache.GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_pages_on_follow(sender, instance, **kwargs):
+    usernames = User.objects.filter(
+        pk__in=[instance.user_id, instance.author_id]
+    ).values_list('username', flat=True)
+    page_cache.invalidate(*(
+        scope for username in usernames
+        for scope in page_cache.profile_scopes(username)
+    ))
@@ -0,0 +1,100 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Follow, Post, User, UserStats
+
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def _count_subquery(model, field):
+    counts = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def with_counts(users):
+    """Добавляет к пользователям точные значения счётчиков."""
+    return users.annotate(**{
+        f'actual_{name}': _count_subquery(model, field)
+        for name, (model, field) in COUNTERS.items()
+    })
+
+
+def get_stats(user):
+    """Счётчики пользователя одним чтением строки.
+
+    Строка создаётся при первом обращении по точным значениям,
+    дальше её поддерживают обработчики сигналов. Если пользователь
+    выбран с select_related('stats'), запросов не будет вовсе.
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        actual = with_counts(User.objects.filter(pk=user.pk)).get()
+        stats, _ = UserStats.objects.get_or_create(
+            user=user,
+            defaults={
+                name: getattr(actual, f'actual_{name}') for name in COUNTERS
+            },
+        )
+        return stats
+
+
+def increment(user_id, **deltas):
+    """Изменяет счётчики в той же транзакции, что и исходная запись.
+
+    Вызывается из обработчиков сигналов: вью сохраняют записи
+    и подписки внутри transaction.atomic, удаление Django и так
+    выполняет в транзакции, поэтому строка и счётчик фиксируются
+    вместе; reconcile_stats нужен только для ремонта. Обновление
+    идёт выражением F(), поэтому параллельные записи не теряют друг
+    друга; уменьшение не опускает счётчик ниже нуля. Если строки
+    ещё нет, её соберёт get_stats.
+    """
+    UserStats.objects.filter(user_id=user_id).update(**{
+        name: F(name) + delta if delta >= 0 else Greatest(F(name) + delta, 0)
+        for name, delta in deltas.items()
+    })
+
+
+def reconcile(users, batch_size=1000):
+    """Сверяет счётчики с таблицами и исправляет расхождения.
+
+    Возвращает количество созданных и исправленных строк.
+    """
+    created = fixed = 0
+    users = with_counts(users.order_by('pk')).select_related('stats')
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return created, fixed
+        last_pk = batch[-1].pk
+        missing, drifted = [], []
+        for user in batch:
+            actual = {
+                name: getattr(user, f'actual_{name}') for name in COUNTERS
+            }
+            try:
+                stats = user.stats
+            except UserStats.DoesNotExist:
+                missing.append(UserStats(user=user, **actual))
+                continue
+            if any(getattr(stats, name) != value
+                   for name, value in actual.items()):
+                for name, value in actual.items():
+                    setattr(stats, name, value)
+                drifted.append(stats)
+        UserStats.objects.bulk_create(missing)
+        UserStats.objects.bulk_update(drifted, list(COUNTERS))
+        created += len(missing)
+        fixed += len(drifted)
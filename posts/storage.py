@@ -0,0 +1,41 @@
+import hashlib
+import os
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME_RE = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файлы под SHA-256 содержимого.
+
+    Файл из upload_to='posts/' ложится в posts/ab/cd/<sha256>.jpg:
+    два уровня подкаталогов по префиксу хеша не дают каталогам
+    разрастаться. Повторная загрузка того же содержимого не пишет
+    файл заново и возвращает имя уже сохранённого; сколько записей
+    на него ссылается, считает модель StoredFile.
+    """
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], digest + extension
+        )
+
+    def _save(self, name, content):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+    @staticmethod
+    def is_content_addressed(name):
+        return bool(HASHED_NAME_RE.search(name))
@@ -0,0 +1,53 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from posts.caching import get_or_compute
+
+register = template.Library()
+
+
+class GuardedCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.expire_time = expire_time
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            expire_time = int(self.expire_time.resolve(context))
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f'"guarded_cache" tag got a non-integer timeout value: '
+                f'{self.expire_time.var!r}'
+            )
+        key = make_template_fragment_key(
+            self.fragment_name,
+            [var.resolve(context) for var in self.vary_on]
+        )
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context), expire_time
+        )
+
+
+@register.tag('guarded_cache')
+def do_guarded_cache(parser, token):
+    """Как {% cache %}, но с защитой от одновременного пересчёта.
+
+        {% guarded_cache 20 index_page page.number %}
+            ...
+        {% endguarded_cache %}
+    """
+    nodelist = parser.parse(('endguarded_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments."
+        )
+    return GuardedCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+    )
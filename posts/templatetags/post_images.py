@@ -0,0 +1,18 @@
+from django import template
+
+from posts.thumbnails import lookup
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_image(post):
+    """Готовые миниатюры или None, пока фоновый пул их не создал.
+
+    Использует найденное заранее thumbnails.prefetch, если оно есть.
+    """
+    if not post.image:
+        return None
+    if hasattr(post, 'responsive_image'):
+        return post.responsive_image
+    return lookup(post.image)
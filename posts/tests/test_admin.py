@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.auth.models import User as AdminUser
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.admin import FollowAdmin
+from posts.models import Comment, Follow, Group, Post, User
+from posts.pagination import EstimatedCountPaginator, estimated_count
+
+
+class AdminChangelistTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Группа', slug='admin-group', description='Описание'
+        )
+        cls.admin = AdminUser.objects.create_superuser(
+            'changelist_admin', 'admin@example.com', 'password'
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(AdminChangelistTest.admin)
+
+    def create_rows(self, count, prefix='admin_author'):
+        for i in range(count):
+            author = User.objects.create(username=f'{prefix}_{i}')
+            post = Post.objects.create(
+                text=f'Запись {i}', author=author, group=self.group
+            )
+            Comment.objects.create(post=post, author=author, text='Ок')
+            Follow.objects.create(user=author, author=self.admin)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        """Число запросов списка в админке не растёт с числом строк."""
+        urls = [
+            reverse(f'admin:posts_{model}_changelist')
+            for model in ('post', 'comment', 'follow')
+        ]
+        self.create_rows(2)
+        few = [self.count_queries(url) for url in urls]
+        self.create_rows(10, prefix='admin_more')
+        many = [self.count_queries(url) for url in urls]
+        self.assertEqual(few, many)
+
+    def test_follow_sidebar_does_not_list_users(self):
+        """Список подписок не выводит всех пользователей в фильтре."""
+        self.assertNotIn('user', FollowAdmin.list_filter)
+        self.assertNotIn('author', FollowAdmin.list_filter)
+
+    def test_estimated_count_only_for_unfiltered_postgres(self):
+        """Оценка не применяется к запросам с условиями и к SQLite."""
+        self.assertIsNone(estimated_count(Post.objects.filter(pk=1)))
+        if connection.vendor != 'postgresql':
+            self.assertIsNone(estimated_count(Post.objects.all()))
+
+    def test_paginator_uses_large_estimate(self):
+        """Большая оценка заменяет COUNT(*), малая — нет."""
+        self.create_rows(3)
+        with mock.patch(
+            'posts.pagination.estimated_count', return_value=10 ** 6
+        ):
+            paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+            with self.assertNumQueries(0):
+                self.assertEqual(paginator.count, 10 ** 6)
+        with mock.patch('posts.pagination.estimated_count', return_value=5):
+            paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+            self.assertEqual(paginator.count, 3)
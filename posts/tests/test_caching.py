@@ -0,0 +1,88 @@
+import time
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+
+from posts.caching import _lock_cache, get_or_compute
+
+
+class Counter:
+    def __init__(self, value='новое'):
+        self.calls = 0
+        self.value = value
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+@override_settings(STAMPEDE_POLL_INTERVAL=0.01)
+class StampedeProtectionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_fresh_value_is_not_recomputed(self):
+        """Свежее значение отдаётся без пересчёта."""
+        compute = Counter()
+        get_or_compute('key', compute, 60, beta=0)
+        get_or_compute('key', compute, 60, beta=0)
+        self.assertEqual(compute.calls, 1)
+
+    def test_expired_value_recomputed_once(self):
+        """Истёкшее значение пересчитывает тот, кто взял блокировку."""
+        cache.set('key', ('старое', 0.1, time.time() - 1), 60)
+        compute = Counter()
+        self.assertEqual(get_or_compute('key', compute, 60), 'новое')
+        self.assertEqual(compute.calls, 1)
+
+    def test_stale_served_while_locked(self):
+        """Пока другой процесс пересчитывает, отдаётся старое значение."""
+        cache.set('key', ('старое', 0.1, time.time() - 1), 60)
+        _lock_cache().add('lock:key', 1, 10)
+        compute = Counter()
+        self.assertEqual(get_or_compute('key', compute, 60), 'старое')
+        self.assertEqual(compute.calls, 0)
+
+    def test_fallback_served_on_cold_key(self):
+        """Для нового ключа отдаётся последняя копия из fallback_key."""
+        cache.set('last', 'прошлая версия', 60)
+        _lock_cache().add('lock:key', 1, 10)
+        compute = Counter()
+        self.assertEqual(
+            get_or_compute('key', compute, 60, fallback_key='last'),
+            'прошлая версия'
+        )
+        self.assertEqual(compute.calls, 0)
+
+    def test_cold_key_waits_for_other_worker(self):
+        """Без копии запрос ждёт окончания аренды и считает сам."""
+        _lock_cache().add('lock:key', 1, 10)
+        compute = Counter()
+        self.assertEqual(
+            get_or_compute('key', compute, 60, lease=0.05), 'новое'
+        )
+        self.assertEqual(compute.calls, 1)
+
+    def test_early_refresh(self):
+        """При большом beta значение обновляется до истечения срока."""
+        compute = Counter()
+        get_or_compute('key', compute, 60)
+        cache.set('key', ('старое', 10, time.time() + 1), 60)
+        self.assertEqual(
+            get_or_compute('key', compute, 60, beta=1000), 'новое'
+        )
+
+    def test_guarded_cache_tag(self):
+        """Тег guarded_cache кэширует фрагмент с учётом vary_on."""
+        template = Template(
+            '{% load guarded_cache %}'
+            '{% guarded_cache 60 fragment number %}{{ text }}'
+            '{% endguarded_cache %}'
+        )
+        first = template.render(Context({'number': 1, 'text': 'один'}))
+        cached = template.render(Context({'number': 1, 'text': 'другой'}))
+        second = template.render(Context({'number': 2, 'text': 'два'}))
+        self.assertEqual(first, 'один')
+        self.assertEqual(cached, 'один')
+        self.assertEqual(second, 'два')
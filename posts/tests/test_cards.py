@@ -0,0 +1,98 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.cards import card_key, render_cards
+from posts.models import Comment, Group, Post, User
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='card_author')
+        cls.reader = User.objects.create_user(username='card_reader')
+        cls.post = Post.objects.create(
+            text='Исходный текст', author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_post(self):
+        return Post.objects.get(pk=PostCardCacheTest.post.pk)
+
+    def test_cards_served_from_cache(self):
+        """Повторный вывод карточки берётся из кэша."""
+        render_cards([self.fresh_post()], AnonymousUser())
+        Post.objects.filter(pk=PostCardCacheTest.post.pk).update(
+            text='Тихо изменённый текст'
+        )
+        card, = render_cards([self.fresh_post()], AnonymousUser())
+        self.assertIn('Исходный текст', card)
+
+    def test_edit_bumps_version(self):
+        """Редактирование записи меняет ключ карточки."""
+        client = Client()
+        client.force_login(PostCardCacheTest.author)
+        render_cards([self.fresh_post()], AnonymousUser())
+        client.post(
+            reverse('posts:post_edit', kwargs={
+                'username': 'card_author',
+                'post_id': PostCardCacheTest.post.pk,
+            }),
+            {'text': 'Новый текст'}
+        )
+        card, = render_cards([self.fresh_post()], AnonymousUser())
+        self.assertIn('Новый текст', card)
+
+    def test_comment_bumps_version(self):
+        """Новый комментарий обновляет счётчик на карточке."""
+        render_cards([self.fresh_post()], AnonymousUser())
+        Comment.objects.create(
+            post=PostCardCacheTest.post,
+            author=PostCardCacheTest.reader,
+            text='Комментарий',
+        )
+        card, = render_cards([self.fresh_post()], AnonymousUser())
+        self.assertIn('Комментариев: 1', card)
+
+    def test_group_changes_bump_version(self):
+        """Переименование и удаление группы обновляют карточки."""
+        group = Group.objects.create(
+            title='Старое название', slug='card-group', description='-'
+        )
+        Post.objects.filter(pk=PostCardCacheTest.post.pk).update(group=group)
+        render_cards([self.fresh_post()], AnonymousUser())
+        group.title = 'Новое название'
+        group.save()
+        card, = render_cards([self.fresh_post()], AnonymousUser())
+        self.assertIn('Новое название', card)
+        group.delete()
+        card, = render_cards([self.fresh_post()], AnonymousUser())
+        self.assertNotIn('card-group', card)
+
+    def test_viewer_classes_have_own_cards(self):
+        """Автор, читатель и гость получают разные карточки."""
+        post = self.fresh_post()
+        keys = {
+            card_key(post, user) for user in (
+                AnonymousUser(),
+                PostCardCacheTest.reader,
+                PostCardCacheTest.author,
+            )
+        }
+        self.assertEqual(len(keys), 3)
+        owner_card, = render_cards([post], PostCardCacheTest.author)
+        reader_card, = render_cards([post], PostCardCacheTest.reader)
+        self.assertIn('Редактировать', owner_card)
+        self.assertNotIn('Редактировать', reader_card)
+
+    def test_feed_renders_cards(self):
+        """Лента группы, профиля и подписок выводит карточки."""
+        response = Client().get(
+            reverse('posts:profile', kwargs={'username': 'card_author'})
+        )
+        self.assertContains(response, 'Исходный текст')
+        self.assertIn(card_key(self.fresh_post(), AnonymousUser()), cache)
@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.comments import comment_page
+from posts.models import Comment, Post, User
+from posts.pagination import encode_cursor
+
+
+@override_settings(COMMENTS_PER_PAGE=2)
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='talker')
+        cls.post = Post.objects.create(text='Обсуждаемая', author=cls.author)
+        cls.commenters = [
+            User.objects.create_user(username=f'commenter{number}')
+            for number in range(3)
+        ]
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post, author=user, text=f'Комментарий {number}'
+            )
+            for number, user in enumerate(cls.commenters)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def post_url(self):
+        return reverse('posts:post', kwargs={
+            'username': 'talker', 'post_id': self.post.pk
+        })
+
+    def fragment_url(self, username='talker'):
+        return reverse('posts:comments', kwargs={
+            'username': username, 'post_id': self.post.pk
+        })
+
+    def cursor_after(self, index):
+        return encode_cursor(self.comments[index], date_field='created')
+
+    def test_first_page_and_more(self):
+        """На странице записи первая порция, остальное — по ссылке."""
+        response = self.guest_client.get(self.post_url())
+        page = response.context['comments_page']
+        self.assertEqual(list(page), self.comments[:2])
+        self.assertTrue(page.has_next())
+        self.assertContains(response, 'Показать ещё')
+
+        response = self.guest_client.get(
+            self.fragment_url(), {'cursor': page.next_cursor}
+        )
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[2:])
+        self.assertFalse(page.has_next())
+        self.assertContains(response, 'Комментарий 2')
+        self.assertNotContains(response, 'Показать ещё')
+        self.assertNotContains(response, '<html')
+
+    def test_page_is_one_query(self):
+        """Порция и признак продолжения читаются одним запросом."""
+        for cursor, more in ((None, True), (self.cursor_after(1), False)):
+            with self.subTest(more=more):
+                with self.assertNumQueries(1):
+                    page = comment_page(self.post.pk, cursor)
+                    self.assertEqual(page.has_next(), more)
+                    self.assertEqual(len(page), 2 if more else 1)
+                    self.assertEqual(len(list(page.object_list)), len(page))
+
+    def test_invalid_cursor_starts_over(self):
+        """Битый курсор открывает первую порцию."""
+        response = self.guest_client.get(
+            self.fragment_url(), {'cursor': 'мусор'}
+        )
+        self.assertEqual(list(response.context['comments']), self.comments[:2])
+
+    def test_fragment_checks_author(self):
+        """Комментарии чужой записи по адресу другого автора не отдаются."""
+        response = self.guest_client.get(self.fragment_url('commenter0'))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(COMMENTS_PER_PAGE=50)
+    def test_queries_do_not_depend_on_comment_count(self):
+        """Авторы комментариев загружаются вместе с ними, без N+1."""
+        def count_queries():
+            with CaptureQueriesContext(connection) as context:
+                response = self.guest_client.get(self.fragment_url())
+            self.assertEqual(response.status_code, 200)
+            return len(context)
+
+        before = count_queries()
+        for user in self.commenters:
+            Comment.objects.create(post=self.post, author=user, text='Ещё')
+        self.assertEqual(count_queries(), before)
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+
+
+class CommentsCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='commenter')
+        cls.post = Post.objects.create(text='Запись', author=cls.user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(CommentsCountTest.user)
+
+    def count(self):
+        return Post.objects.get(pk=CommentsCountTest.post.pk).comments_count
+
+    def test_add_comment_increments_count(self):
+        """add_comment увеличивает счётчик комментариев записи."""
+        self.authorized_client.post(
+            reverse('posts:add_comment', kwargs={
+                'username': 'commenter',
+                'post_id': CommentsCountTest.post.pk,
+            }),
+            {'text': 'Комментарий'}
+        )
+        self.assertEqual(self.count(), 1)
+
+    def test_delete_comment_decrements_count(self):
+        """Удаление комментария уменьшает счётчик."""
+        comment = Comment.objects.create(
+            post=CommentsCountTest.post,
+            author=CommentsCountTest.user,
+            text='Комментарий',
+        )
+        comment.delete()
+        self.assertEqual(self.count(), 0)
+
+    def test_edit_keeps_count(self):
+        """Редактирование записи не затирает счётчик."""
+        Comment.objects.create(
+            post=CommentsCountTest.post,
+            author=CommentsCountTest.user,
+            text='Комментарий',
+        )
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={
+                'username': 'commenter',
+                'post_id': CommentsCountTest.post.pk,
+            }),
+            {'text': 'Новый текст'}
+        )
+        self.assertEqual(self.count(), 1)
+
+    def test_backfill_command(self):
+        """backfill_comments_count восстанавливает счётчики."""
+        Comment.objects.create(
+            post=CommentsCountTest.post,
+            author=CommentsCountTest.user,
+            text='Комментарий',
+        )
+        Post.objects.update(comments_count=0)
+        call_command('backfill_comments_count', stdout=StringIO())
+        self.assertEqual(self.count(), 1)
@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag_author')
+        cls.post = Post.objects.create(text='Запись', author=cls.author)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'etag_author'}),
+            reverse('posts:post', kwargs={
+                'username': 'etag_author', 'post_id': cls.post.pk,
+            }),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_unchanged_pages_return_304(self):
+        """Неизменившаяся страница отвечает 304 по ETag и дате."""
+        for url in ConditionalGetTest.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                etag_response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag']
+                )
+                date_response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+                )
+                self.assertEqual(etag_response.status_code, 304)
+                self.assertEqual(date_response.status_code, 304)
+
+    def test_comment_changes_validator(self):
+        """Новый комментарий меняет ETag страницы записи."""
+        url = ConditionalGetTest.urls[2]
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(
+            post=ConditionalGetTest.post,
+            author=ConditionalGetTest.author,
+            text='Комментарий',
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        """Гость и автор получают разные ETag."""
+        url = ConditionalGetTest.urls[0]
+        etag = self.guest_client.get(url)['ETag']
+        self.guest_client.force_login(ConditionalGetTest.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_evicted_changed_time_is_restored(self):
+        """Без ключей времени изменения страница не падает."""
+        url = ConditionalGetTest.urls[0]
+        self.guest_client.get(url)
+        cache.delete_many(['page_changed:all', 'page_changed:index'])
+        response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Last-Modified', response)
+        self.assertIsNotNone(cache.get('page_changed:index'))
@@ -0,0 +1,86 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.feeds import PerAuthorFeed, follow_feed
+from posts.models import Follow, Post, User
+from posts.pagination import KeysetPaginator
+from posts.timeline import FollowFeed
+from yatube import metrics
+
+
+class PerAuthorFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create(username='reader')
+        cls.authors = [
+            User.objects.create(username=f'author_{i}') for i in range(3)
+        ]
+        for i in range(12):
+            Post.objects.create(
+                text=f'Запись {i}', author=cls.authors[i % 3]
+            )
+        User.objects.create(username='stranger').posts.create(text='Чужая')
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.expected = list(
+            Post.objects.filter(author__following__user=cls.reader)
+            .order_by('-pub_date', '-pk')
+        )
+
+    def test_slices_match_join(self):
+        """Срезы совпадают с результатом соединения с подписками."""
+        feed = PerAuthorFeed(a.pk for a in PerAuthorFeedTest.authors)
+        self.assertEqual(feed.count(), 12)
+        self.assertEqual(feed[0:5], PerAuthorFeedTest.expected[0:5])
+        self.assertEqual(feed[5:10], PerAuthorFeedTest.expected[5:10])
+        self.assertEqual(feed[3], PerAuthorFeedTest.expected[3])
+
+    def test_keyset_pages_match_join(self):
+        """Курсорный обход ленты совпадает с соединением."""
+        paginator = KeysetPaginator(
+            PerAuthorFeed(a.pk for a in PerAuthorFeedTest.authors), 5
+        )
+        first = paginator.get_page()
+        second = paginator.get_page(before=first.next_cursor)
+        back = paginator.get_page(after=second.previous_cursor)
+        self.assertEqual(
+            list(first) + list(second), PerAuthorFeedTest.expected[:10]
+        )
+        self.assertEqual(list(back), list(first))
+
+    def test_planner_chooses_strategy(self):
+        """Планировщик сливает ленты, пока авторов немного."""
+        features = connection.features
+        with mock.patch.object(
+            features, 'supports_slicing_ordering_in_compound', True
+        ):
+            self.assertIsInstance(
+                follow_feed(PerAuthorFeedTest.reader), PerAuthorFeed
+            )
+        with mock.patch.object(
+            features, 'supports_slicing_ordering_in_compound', False
+        ):
+            self.assertIsInstance(
+                follow_feed(PerAuthorFeedTest.reader), FollowFeed
+            )
+        with override_settings(FOLLOW_MERGE_MAX_AUTHORS=3):
+            self.assertIsInstance(
+                follow_feed(PerAuthorFeedTest.reader), FollowFeed
+            )
+
+    def test_follow_page_fits_budget(self):
+        """Страница подписок на 20 авторов укладывается в бюджет."""
+        reader = User.objects.create(username='many_follows')
+        for number in range(20):
+            author = User.objects.create(username=f'many_{number}')
+            author.posts.create(text=f'Запись {number}')
+            Follow.objects.create(user=reader, author=author)
+        client = Client()
+        client.force_login(reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page']), 10)
+        metrics.assert_query_budget(response)
@@ -7,6 +7,7 @@ from django.test import Client, TestCase
 from django.urls import reverse
 
 from posts.models import Group, Post, User
+from posts.storage import ContentAddressedStorage
 
 
 class PostFormTests(TestCase):
@@ -68,12 +69,14 @@ class PostFormTests(TestCase):
         )
         self.assertRedirects(response, reverse('posts:index'))
         self.assertEqual(Post.objects.count(), posts_count + 1)
+        post = Post.objects.get(
+            group=PostFormTests.group,
+            text='Тестовый текст',
+        )
+        self.assertTrue(post.image.name.startswith('posts/'))
+        self.assertTrue(post.image.name.endswith('.gif'))
         self.assertTrue(
-            Post.objects.filter(
-                group=PostFormTests.group,
-                text='Тестовый текст',
-                image='posts/small.gif',
-            ).exists()
+            ContentAddressedStorage.is_content_addressed(post.image.name)
         )
 
     def test_edit_post(self):
@@ -118,10 +121,11 @@ class PostFormTests(TestCase):
                 }),
         )
         self.assertEqual(Post.objects.count(), posts_count)
+        post = Post.objects.get(
+            group=PostFormTests.group,
+            text='Измененый текст',
+        )
+        self.assertTrue(post.image.name.startswith('posts/'))
         self.assertTrue(
-            Post.objects.filter(
-                group=PostFormTests.group,
-                text='Измененый текст',
-                image='posts/another_small.gif',
-            ).exists()
+            ContentAddressedStorage.is_content_addressed(post.image.name)
         )
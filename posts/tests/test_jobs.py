@@ -0,0 +1,124 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import InterfaceError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from posts import jobs
+from posts.models import Job
+
+calls = []
+
+
+@jobs.task
+def record(value, suffix=''):
+    calls.append(f'{value}{suffix}')
+
+
+@jobs.task(max_attempts=2)
+def explode():
+    raise ValueError('сломалось')
+
+
+@override_settings(JOBS_RETRY_DELAY=10, JOBS_RETRY_MAX_DELAY=60)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_and_run(self):
+        """Задача из очереди выполняется и удаляется."""
+        job = record.delay('a', suffix='!')
+        self.assertEqual(job.task, 'posts.tests.test_jobs.record')
+        claimed = jobs.claim('worker')
+        self.assertEqual(claimed, [job])
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertTrue(jobs.run(claimed[0]))
+        self.assertEqual(calls, ['a!'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_claimed_job_is_not_shared(self):
+        """Захваченную задачу другой обработчик не получит до конца срока."""
+        record.delay('a')
+        self.assertEqual(len(jobs.claim('first')), 1)
+        self.assertEqual(jobs.claim('second'), [])
+        Job.objects.update(locked_until=timezone.now() - timedelta(1))
+        self.assertEqual(len(jobs.claim('second')), 1)
+
+    def test_future_job_waits(self):
+        """Задача с run_at в будущем пока не выдаётся."""
+        job = record.delay('a')
+        Job.objects.filter(pk=job.pk).update(
+            run_at=timezone.now() + timedelta(hours=1)
+        )
+        self.assertEqual(jobs.claim('worker'), [])
+
+    def test_retry_with_backoff(self):
+        """Ошибка откладывает задачу, после последней попытки — failed."""
+        explode.delay()
+        before = timezone.now()
+        with self.assertLogs('posts.jobs', 'ERROR'):
+            self.assertFalse(jobs.run(jobs.claim('worker')[0]))
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.locked_by, '')
+        self.assertIn('сломалось', job.last_error)
+        self.assertGreaterEqual(job.run_at, before + timedelta(seconds=10))
+        self.assertEqual(jobs.claim('worker'), [])
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('posts.jobs', 'ERROR'):
+            self.assertFalse(jobs.run(jobs.claim('worker')[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(jobs.claim('worker'), [])
+
+    def test_backoff_is_capped(self):
+        """Пауза удваивается, но не превышает JOBS_RETRY_MAX_DELAY."""
+        self.assertEqual(
+            [jobs.backoff(attempt) for attempt in range(1, 6)],
+            [10, 20, 40, 60, 60]
+        )
+
+    def test_only_registered_tasks_run(self):
+        """Произвольная функция по имени не выполняется."""
+        jobs.enqueue('os.getcwd')
+        with self.assertLogs('posts.jobs', 'ERROR'):
+            self.assertFalse(jobs.run(jobs.claim('worker')[0]))
+        self.assertIn('LookupError', Job.objects.get().last_error)
+
+
+class RunJobsCommandTest(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_burst(self):
+        """run_jobs --burst выполняет очередь и завершается."""
+        for value in 'abc':
+            record.delay(value)
+        out = StringIO()
+        call_command('run_jobs', burst=True, stdout=out)
+        self.assertEqual(sorted(calls), ['a', 'b', 'c'])
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('3', out.getvalue())
+
+    def test_worker_survives_connection_errors(self):
+        """Обрыв соединения не останавливает обработчик."""
+        record.delay('a')
+        claim = jobs.claim
+        failures = [InterfaceError('connection already closed')]
+
+        def flaky_claim(worker):
+            if failures:
+                raise failures.pop()
+            return claim(worker)
+
+        with mock.patch.object(jobs, 'claim', flaky_claim), \
+                mock.patch.object(jobs, 'close_old_connections') as close, \
+                self.assertLogs('posts.jobs', 'ERROR'):
+            self.assertEqual(jobs.work(burst=True, poll_interval=0), 1)
+        self.assertEqual(calls, ['a'])
+        self.assertGreaterEqual(close.call_count, 2)
@@ -0,0 +1,130 @@
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import LiveServerTestCase, TestCase
+
+from posts import loadtest
+from posts.models import Comment, Group, Post
+from posts.seeding import Seeder
+
+
+def result(p95=10.0, rps=100.0, queries=4.0):
+    return {
+        'requests': 10, 'errors': 0, 'rps': rps,
+        'latency_ms': {'p50': 5.0, 'p95': p95, 'p99': p95, 'max': p95},
+        'queries': {'mean': queries, 'max': queries},
+    }
+
+
+class LoadTestTest(TestCase):
+    def setUp(self):
+        Seeder(
+            users=10, groups=2, posts=60, comments=120, follows=3,
+            until=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        ).run()
+
+    def test_percentile(self):
+        """Перцентили интерполируются между соседними значениями."""
+        samples = list(range(1, 101))
+        self.assertEqual(loadtest.percentile(samples, 50), 50.5)
+        self.assertAlmostEqual(loadtest.percentile(samples, 99), 99.01)
+        self.assertEqual(loadtest.percentile([7], 95), 7)
+        self.assertIsNone(loadtest.percentile([], 50))
+
+    def test_all_scenarios(self):
+        """Каждый сценарий отвечает без ошибок и считает запросы к базе."""
+        posts = Post.objects.count()
+        comments = Comment.objects.count()
+        results = loadtest.run(loadtest.SCENARIOS, clients=1, requests=5)
+        for scenario, summary in results.items():
+            with self.subTest(scenario=scenario):
+                self.assertEqual(summary['requests'], 5)
+                self.assertEqual(summary['errors'], 0)
+                self.assertGreater(summary['queries']['mean'], 0)
+                self.assertLessEqual(
+                    summary['latency_ms']['p50'],
+                    summary['latency_ms']['p99'],
+                )
+        self.assertEqual(Post.objects.count(), posts + 5)
+        self.assertEqual(Comment.objects.count(), comments + 5)
+
+    def test_regressions(self):
+        """Рост p95, падение rps и лишние запросы считаются ухудшением."""
+        baseline = {'index': result(), 'post': result()}
+        self.assertEqual(loadtest.regressions(baseline, {
+            'index': result(p95=10.5, rps=95.0), 'new': result(),
+        }, tolerance=0.1), [])
+        found = loadtest.regressions(baseline, {
+            'index': result(p95=20.0, rps=50.0), 'post': result(queries=5.0),
+        }, tolerance=0.1)
+        self.assertEqual(len(found), 3)
+
+    def test_command_output_and_baseline(self):
+        """Команда сохраняет JSON и сравнивает прогон с прошлым."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command(
+                'bench_views', clients=1, requests=3, warmup=0,
+                read_only=True, scenarios=['index', 'post'],
+                output=output, stdout=StringIO(),
+            )
+            with open(output) as report:
+                saved = json.load(report)
+            self.assertEqual(list(saved['results']), ['index', 'post'])
+            saved['results']['post']['queries']['mean'] = 0
+            with open(output, 'w') as report:
+                json.dump(saved, report)
+            with self.assertRaisesMessage(CommandError, 'Ухудшений: 1'):
+                call_command(
+                    'bench_views', clients=1, requests=3, warmup=0,
+                    scenarios=['post'], baseline=output, tolerance=100,
+                    stdout=StringIO(),
+                )
+
+    def test_anonymous_clients_and_no_groups(self):
+        """Анонимный прогон и база без групп пропускают лишние сценарии."""
+        Group.objects.all().delete()
+        with self.assertLogs('posts.loadtest', 'WARNING') as logs:
+            results = loadtest.run(
+                loadtest.SCENARIOS, clients=1, requests=2, anonymous=True
+            )
+        self.assertEqual(len(logs.output), 5)
+        self.assertEqual(list(results), ['index', 'profile', 'post'])
+        for summary in results.values():
+            self.assertEqual(summary['errors'], 0)
+
+    def test_command_prints_empty_results(self):
+        """Прогон без запросов печатается прочерками."""
+        out = StringIO()
+        call_command(
+            'bench_views', clients=1, requests=0, warmup=0,
+            scenarios=['index'], stdout=out,
+        )
+        self.assertIn('-', out.getvalue().splitlines()[1])
+
+
+class HttpLoadTestTest(LiveServerTestCase):
+    def setUp(self):
+        Seeder(
+            users=5, groups=1, posts=20, comments=10, follows=2,
+            until=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        ).run()
+
+    def test_scenarios_over_http(self):
+        """С адресом сервера клиенты ходят по HTTP, вход и CSRF работают."""
+        posts = Post.objects.count()
+        results = loadtest.run(
+            ['index', 'post', 'new_post'], clients=1, requests=3,
+            base_url=self.live_server_url,
+        )
+        for scenario, summary in results.items():
+            with self.subTest(scenario=scenario):
+                self.assertEqual(summary['requests'], 3)
+                self.assertEqual(summary['errors'], 0)
+                self.assertGreater(summary['queries']['mean'], 0)
+        self.assertEqual(Post.objects.count(), posts + 3)
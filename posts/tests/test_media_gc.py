@@ -0,0 +1,151 @@
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+
+from posts import media, thumbnails
+from posts.media import BloomFilter
+from posts.models import Post, StoredFile, User
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_gif(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 1), color).save(buffer, 'GIF')
+    return SimpleUploadedFile('image.gif', buffer.getvalue(), 'image/gif')
+
+
+class MediaTestMixin:
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='gc_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self, color):
+        post = Post.objects.create(
+            text='Картинка', author=self.author, image=make_gif(color)
+        )
+        thumbnails.generate(post.image.name)
+        return post
+
+    def thumbnail_paths(self, post):
+        return [
+            default.storage.path(name)
+            for name in thumbnails.thumbnail_names([post.image.name])
+        ]
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageCleanupTest(MediaTestMixin, TransactionTestCase):
+    def test_replaced_image_is_removed(self):
+        """Заменённое изображение удаляется вместе с миниатюрами."""
+        post = self.create_post('red')
+        old_path = post.image.path
+        old_thumbnails = self.thumbnail_paths(post)
+        self.assertTrue(old_thumbnails)
+        client = Client()
+        client.force_login(self.author)
+        client.post(
+            reverse('posts:post_edit', args=[self.author.username, post.pk]),
+            {'text': 'Новая картинка', 'image': make_gif('blue')},
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.path, old_path)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertFalse(any(map(os.path.exists, old_thumbnails)))
+        self.assertTrue(os.path.exists(post.image.path))
+
+    def test_shared_image_survives_until_last_reference(self):
+        """Общий файл удаляется только вместе с последней записью."""
+        first = self.create_post('green')
+        second = self.create_post('green')
+        path = first.image.path
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        self.author.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(StoredFile.objects.filter(pk=second.image.name))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class GarbageCollectionTest(MediaTestMixin, TestCase):
+    def create_orphans(self):
+        storage = Post._meta.get_field('image').storage
+        image = storage.save('posts/orphan.gif', make_gif('yellow'))
+        thumbnail = default.storage.save(
+            'cache/00/00/orphan.jpg', ContentFile(b'jpeg')
+        )
+        return storage.path(image), default.storage.path(thumbnail)
+
+    def run_gc(self, **options):
+        call_command(
+            'gc_media', min_age=0, stdout=open(os.devnull, 'w'), **options
+        )
+
+    def test_orphans_are_removed(self):
+        """Сборщик удаляет файлы без ссылок и не трогает нужные."""
+        post = self.create_post('red')
+        kept = [post.image.path] + self.thumbnail_paths(post)
+        orphans = self.create_orphans()
+        self.run_gc(dry_run=True)
+        self.assertTrue(all(map(os.path.exists, orphans)))
+        self.run_gc()
+        self.assertFalse(any(map(os.path.exists, orphans)))
+        self.assertTrue(all(map(os.path.exists, kept)))
+
+    def test_bloom_index(self):
+        """С фильтром Блума нужные файлы тоже сохраняются."""
+        post = self.create_post('blue')
+        kept = [post.image.path] + self.thumbnail_paths(post)
+        orphans = self.create_orphans()
+        self.run_gc(bloom=True)
+        self.assertTrue(all(map(os.path.exists, kept)))
+        self.assertFalse(any(map(os.path.exists, orphans)))
+
+    def test_fresh_files_are_kept(self):
+        """Файлы моложе min_age не удаляются."""
+        orphans = self.create_orphans()
+        call_command('gc_media', stdout=open(os.devnull, 'w'))
+        self.assertTrue(all(map(os.path.exists, orphans)))
+
+    def test_image_referenced_after_index_is_kept(self):
+        """Файл, на который сослались после сборки индекса, остаётся."""
+        image, _ = self.create_orphans()
+        name = os.path.relpath(image, MEDIA_ROOT).replace(os.sep, '/')
+        build_index = media.build_index
+
+        def build_then_reference(*args, **kwargs):
+            index = build_index(*args, **kwargs)
+            Post.objects.create(text='Позже', author=self.author, image=name)
+            return index
+
+        with mock.patch.object(media, 'build_index', build_then_reference):
+            self.run_gc()
+        self.assertTrue(os.path.exists(image))
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Фильтр Блума находит все добавленные элементы."""
+        bloom = BloomFilter(1000)
+        items = [f'posts/{i}.jpg' for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        misses = sum(f'other/{i}.jpg' in bloom for i in range(1000))
+        self.assertLess(misses, 20)
@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import views
+from posts.models import Comment, Follow, Group, Post, User
+from yatube import metrics
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.users = [
+            User.objects.create_user(username=f'metrics{number}')
+            for number in range(4)
+        ]
+        cls.group = Group.objects.create(
+            title='Группа', slug='metrics', description='Описание'
+        )
+        for number in range(15):
+            post = Post.objects.create(
+                text=f'Запись номер {number}',
+                author=cls.users[number % 4],
+                group=cls.group,
+            )
+            for user in cls.users[:3]:
+                Comment.objects.create(post=post, author=user, text='Да')
+        cls.post = post
+        for author in cls.users[1:]:
+            Follow.objects.create(user=cls.users[0], author=author)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(MetricsTest.users[0])
+
+    def test_server_timing_header(self):
+        """Ответ содержит Server-Timing с числом запросов и временем."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        header = response['Server-Timing']
+        self.assertIn(f'{response.metrics.query_count} queries', header)
+        self.assertIn('db;dur=', header)
+        self.assertIn('tpl;dur=', header)
+        self.assertGreater(response.metrics.query_count, 0)
+        self.assertGreater(response.metrics.template_time, 0)
+
+    def test_aggregate_by_view_name(self):
+        """Сводка процесса копится по имени вью."""
+        for _ in range(2):
+            self.guest_client.get(reverse('posts:group_list'))
+        self.guest_client.get('/нет/такой/страницы/')
+        stats = metrics.snapshot()
+        self.assertEqual(stats['posts:group_list']['requests'], 2)
+        self.assertEqual(stats['posts:group_list']['queries'], 2)
+        self.assertIn(metrics.UNRESOLVED, stats)
+
+    def test_duplicates_are_counted(self):
+        """Повтор запроса с теми же параметрами считается дублем."""
+        request_metrics = metrics.RequestMetrics()
+        for params in ([1], [1], [2]):
+            request_metrics.add_query('SELECT %s', params, False, 0.001)
+        self.assertEqual(request_metrics.query_count, 3)
+        self.assertEqual(request_metrics.duplicates, 1)
+
+    def test_pages_fit_query_budget(self):
+        """Страницы укладываются в объявленный бюджет запросов."""
+        username = self.post.author.username
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'metrics'}),
+            reverse('posts:profile', kwargs={'username': username}),
+            reverse('posts:post', kwargs={
+                'username': username, 'post_id': self.post.pk
+            }),
+            reverse('posts:comments', kwargs={
+                'username': username, 'post_id': self.post.pk
+            }),
+            reverse('posts:follow_index'),
+            reverse('posts:search') + '?q=запись',
+        ]
+        for client in (self.guest_client, self.authorized_client):
+            for url in urls:
+                cache.clear()
+                response = client.get(url)
+                if response.status_code != 200:
+                    continue
+                with self.subTest(url=url):
+                    metrics.assert_query_budget(response)
+                    self.assertEqual(response.metrics.duplicates, 0)
+
+    def test_budget_violation_fails(self):
+        """Превышение бюджета роняет проверку со списком запросов."""
+        response = self.guest_client.get(reverse('posts:index'))
+        with self.assertRaisesMessage(AssertionError, 'при бюджете 0'):
+            metrics.assert_query_budget(response, budget=0)
+
+    def test_every_response_is_checked(self):
+        """Тестовый раннер проверяет бюджет у каждого ответа сам."""
+        self.assertTrue(settings.QUERY_BUDGET_STRICT)
+        with mock.patch.object(views.index, 'query_budget', 0):
+            with self.assertLogs('yatube.metrics', 'WARNING'):
+                with self.assertRaisesMessage(
+                    AssertionError, 'при бюджете 0'
+                ):
+                    self.guest_client.get(reverse('posts:index'))
@@ -0,0 +1,65 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class AnonymousPageCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cached_author')
+        cls.reader = User.objects.create_user(username='cached_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cached', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Запись', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def assertRefreshed(self, url, change):
+        self.guest_client.get(url)
+        self.assertIsNone(self.guest_client.get(url).context)
+        change()
+        self.assertIsNotNone(self.guest_client.get(url).context)
+
+    @override_settings(PAGE_CACHE_SINGLE_PROCESS=False)
+    def test_disabled_with_process_local_cache(self):
+        """С общим кэшем в памяти процесса страницы не кэшируются."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        response = self.guest_client.get(url)
+        self.assertIsNotNone(response.context)
+        self.assertNotIn('ETag', response)
+
+    def test_follow_invalidates_profile(self):
+        """Подписка сбрасывает кэш профиля автора."""
+        self.assertRefreshed(
+            reverse('posts:profile', kwargs={'username': 'cached_author'}),
+            lambda: Follow.objects.create(
+                user=AnonymousPageCacheTest.reader,
+                author=AnonymousPageCacheTest.author,
+            )
+        )
+
+    def test_comment_invalidates_group(self):
+        """Комментарий сбрасывает кэш страницы группы записи."""
+        self.assertRefreshed(
+            reverse('posts:group_posts', kwargs={'slug': 'cached'}),
+            lambda: Comment.objects.create(
+                post=AnonymousPageCacheTest.post,
+                author=AnonymousPageCacheTest.reader,
+                text='Комментарий',
+            )
+        )
+
+    def test_group_change_invalidates_all_pages(self):
+        """Изменение группы сбрасывает кэш всех страниц."""
+        group = AnonymousPageCacheTest.group
+        group.title = 'Новое название'
+        self.assertRefreshed(reverse('posts:index'), group.save)
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+from posts.pagination import (KeysetPage, KeysetPaginator, decode_cursor,
+                              encode_cursor)
+
+
+class KeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='keyset_author')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='keyset',
+            description='Группа для курсоров',
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(25)
+        )
+        cls.posts = list(Post.objects.order_by('-pub_date', '-pk'))
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_cursor_round_trip(self):
+        """Курсор однозначно восстанавливает (pub_date, id)."""
+        post = KeysetPaginationTest.posts[0]
+        self.assertEqual(
+            decode_cursor(encode_cursor(post)),
+            (post.pub_date, post.pk)
+        )
+
+    def test_pages_cover_feed_without_gaps(self):
+        """Переходы по ?before= обходят ленту без пропусков и повторов."""
+        paginator = KeysetPaginator(Post.objects.all(), 10)
+        seen = []
+        page = paginator.get_page()
+        while True:
+            seen.extend(page)
+            if not page.has_next():
+                break
+            page = paginator.get_page(before=page.next_cursor)
+        self.assertEqual(seen, KeysetPaginationTest.posts)
+
+    def test_after_returns_previous_page(self):
+        """?after= возвращает предыдущую страницу в прежнем порядке."""
+        paginator = KeysetPaginator(Post.objects.all(), 10)
+        first = paginator.get_page()
+        second = paginator.get_page(before=first.next_cursor)
+        back = paginator.get_page(after=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_feeds_switch_to_keyset_by_cursor(self):
+        """Ленты переходят в режим курсоров при наличии ?before=."""
+        cursor = encode_cursor(KeysetPaginationTest.posts[9])
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_posts', kwargs={'slug': 'keyset'}),
+            reverse('posts:profile', kwargs={'username': 'keyset_author'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, {'before': cursor})
+                page = response.context['page']
+                self.assertIsInstance(page, KeysetPage)
+                self.assertEqual(
+                    list(page), KeysetPaginationTest.posts[10:20]
+                )
+                self.assertContains(response, '?before=')
+
+    def test_invalid_cursor_opens_first_page(self):
+        """Битый курсор открывает первую страницу."""
+        response = self.guest_client.get(
+            reverse('posts:index'), {'before': 'garbage'}
+        )
+        self.assertEqual(
+            list(response.context['page']),
+            KeysetPaginationTest.posts[:10]
+        )
+
+    @override_settings(KEYSET_PAGINATION=True)
+    def test_setting_enables_keyset_mode(self):
+        """KEYSET_PAGINATION включает курсоры и для первой страницы."""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertIsInstance(response.context['page'], KeysetPage)
+        self.assertFalse(response.context['page'].has_previous())
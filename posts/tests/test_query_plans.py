@@ -0,0 +1,59 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, skipUnlessDBFeature
+
+from posts import plans
+from posts.models import User
+
+
+class QueryPlanTest(TestCase):
+    def test_views_use_indexes(self):
+        """Запросы всех страниц posts читают большие таблицы по индексам."""
+        viewer, post = plans.seed(300)
+        client = Client()
+        client.force_login(viewer)
+        self.assertEqual(plans.check_views(client, post), [])
+
+    @skipUnlessDBFeature('can_rollback_ddl')
+    def test_missing_index_is_reported(self):
+        """Без индекса (group, pub_date) лента группы проваливает проверку."""
+        viewer, post = plans.seed(300)
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX post_group_date_idx')
+        client = Client()
+        client.force_login(viewer)
+        failures = plans.check_views(client, post)
+        self.assertIn('group_posts', [name for name, _, _ in failures])
+
+    def test_sqlite_problems(self):
+        """Полный просмотр и сортировка без индекса распознаются."""
+        self.assertEqual(len(plans.sqlite_problems(
+            'SELECT * FROM posts_comment WHERE text = %s',
+            ['SCAN posts_comment', 'USE TEMP B-TREE FOR ORDER BY'],
+        )), 2)
+        self.assertEqual(plans.sqlite_problems(
+            'SELECT * FROM posts_post ORDER BY pub_date DESC LIMIT 10',
+            ['SCAN posts_post USING INDEX posts_post_pub_date'],
+        ), [])
+
+    def test_postgres_problems(self):
+        """Seq Scan большой таблицы и сортировка на диске распознаются."""
+        plan = [{'Plan': {
+            'Node Type': 'Sort',
+            'Sort Space Type': 'Disk',
+            'Sort Key': ['pub_date'],
+            'Plans': [{
+                'Node Type': 'Seq Scan',
+                'Relation Name': 'posts_follow',
+            }],
+        }}]
+        self.assertEqual(len(plans.postgres_problems(plan)), 2)
+
+    def test_command(self):
+        """Команда откатывает созданные данные."""
+        out = StringIO()
+        call_command('check_query_plans', posts=50, stdout=out)
+        self.assertIn('в порядке', out.getvalue())
+        self.assertFalse(User.objects.exists())
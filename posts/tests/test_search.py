@@ -0,0 +1,130 @@
+from django.contrib.auth.models import User as AdminUser
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.search import rebuild_index, search_ids, search_page
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='search_author')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def ids(self, query):
+        return [pk for pk, _ in search_ids(query)]
+
+    def test_new_post_is_indexed(self):
+        """Новая запись сразу находится по словам из текста."""
+        post = Post.objects.create(
+            text='Сегодня ходили в поход на байдарках', author=self.author
+        )
+        Post.objects.create(text='Совсем другое', author=self.author)
+        self.assertEqual(self.ids('байдарках'), [post.pk])
+
+    def test_edited_and_deleted_posts(self):
+        """Правка текста обновляет индекс, удаление убирает запись."""
+        post = Post.objects.create(text='Черновик', author=self.author)
+        post.text = 'Чистовик'
+        post.save(update_fields=['text'])
+        self.assertEqual(self.ids('Черновик'), [])
+        self.assertEqual(self.ids('Чистовик'), [post.pk])
+        post.delete()
+        self.assertEqual(self.ids('Чистовик'), [])
+
+    def test_rebuild_range(self):
+        """Перестройка по диапазону id не трогает остальные записи."""
+        first = Post.objects.create(text='Старое', author=self.author)
+        second = Post.objects.create(text='Старое', author=self.author)
+        Post.objects.update(text='Новое')
+        rebuild_index((second.pk, second.pk))
+        self.assertEqual(self.ids('Новое'), [second.pk])
+        self.assertEqual(self.ids('Старое'), [first.pk])
+
+    def test_results_are_ranked(self):
+        """Выше ранжируется запись с большим числом совпадений."""
+        weak = Post.objects.create(
+            text='кот ' + 'слово ' * 30, author=self.author
+        )
+        strong = Post.objects.create(text='кот кот кот', author=self.author)
+        self.assertEqual(self.ids('кот'), [strong.pk, weak.pk])
+
+    def test_query_syntax_is_escaped(self):
+        """Служебные символы в запросе не ломают поиск."""
+        post = Post.objects.create(text='Кавычки и звёзды', author=self.author)
+        self.assertEqual(self.ids('"кавычки* (звёзды:'), [post.pk])
+        self.assertEqual(self.ids('***'), [])
+
+    def test_cursor_pages_cover_results(self):
+        """Переходы по курсору обходят выдачу без пропусков и повторов."""
+        posts = [
+            Post.objects.create(text=f'Заметка {i}', author=self.author)
+            for i in range(7)
+        ]
+        seen = []
+        cursor = None
+        while True:
+            page = search_page('заметка', cursor, per_page=3)
+            seen += [post.pk for post in page]
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertCountEqual(seen, [post.pk for post in posts])
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс для записей без сигналов."""
+        Post.objects.bulk_create([
+            Post(text='Массовая загрузка', author=self.author)
+        ])
+        self.assertEqual(self.ids('Массовая'), [])
+        call_command('rebuild_search_index', stdout=open('/dev/null', 'w'))
+        self.assertEqual(len(self.ids('Массовая')), 1)
+
+    @override_settings(PER_PAGE=2)
+    def test_search_view(self):
+        """Страница поиска выводит найденное и ссылку на продолжение."""
+        for i in range(3):
+            Post.objects.create(text=f'Рецепт {i}', author=self.author)
+        response = self.guest_client.get(
+            reverse('posts:search'), {'q': 'рецепт'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), 2)
+        self.assertContains(response, 'cursor=')
+        response = self.guest_client.get(
+            reverse('posts:search'),
+            {'q': 'рецепт', 'cursor': response.context['page'].next_cursor}
+        )
+        self.assertEqual(len(response.context['page']), 1)
+        self.assertNotContains(response, 'cursor=')
+
+    def test_empty_query(self):
+        """Без запроса показывается только форма."""
+        response = self.guest_client.get(reverse('posts:search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['page'])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит записи через индекс."""
+        post = Post.objects.create(text='Админский текст', author=self.author)
+        Post.objects.create(text='Посторонний', author=self.author)
+        admin = AdminUser.objects.create_superuser(
+            'search_admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'админский'}
+        )
+        self.assertEqual(
+            [obj.pk for obj in response.context['cl'].result_list],
+            [post.pk]
+        )
@@ -0,0 +1,112 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count, F
+from django.test import TestCase
+
+from posts import page_cache, search, stats, timeline
+from posts.models import Comment, Follow, Post, TimelineEntry, User
+from posts.seeding import CopyFile, Seeder, WORDS
+
+UNTIL = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class SeedTest(TestCase):
+    def seed(self, **options):
+        counts = {
+            'users': 30, 'groups': 3, 'posts': 300,
+            'comments': 600, 'follows': 5,
+        }
+        counts.update(options)
+        return Seeder(until=UNTIL, **counts).run()
+
+    def snapshot(self):
+        base = User.objects.order_by('pk').first().pk
+        return [
+            (author_id - base, text, pub_date, comments_count)
+            for author_id, text, pub_date, comments_count in
+            Post.objects.order_by('pk').values_list(
+                'author_id', 'text', 'pub_date', 'comments_count'
+            )
+        ]
+
+    def test_counts(self):
+        """Создаётся ровно столько строк, сколько заказано."""
+        written = self.seed()
+        self.assertEqual(written['posts'], Post.objects.count())
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 600)
+        self.assertEqual(written['follows'], Follow.objects.count())
+        self.assertEqual(written['timeline'], TimelineEntry.objects.count())
+
+    def test_deterministic(self):
+        """Тот же seed даёт те же данные."""
+        self.seed()
+        first = self.snapshot()
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        self.seed()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_power_law_authors(self):
+        """Немногие авторы пишут большую часть записей."""
+        self.seed(users=100, posts=2000)
+        per_author = sorted(
+            Post.objects.order_by().values('author')
+            .annotate(total=Count('pk'))
+            .values_list('total', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(sum(per_author[:10]), 1000)
+
+    def test_denormalized_data_is_consistent(self):
+        """Счётчики, лента и поиск согласованы без сигналов."""
+        self.seed()
+        self.assertEqual(stats.reconcile(User.objects.all()), (0, 0))
+        mismatched = Post.objects.annotate(
+            actual=Count('comments')
+        ).exclude(comments_count=F('actual'))
+        self.assertFalse(mismatched.exists())
+        follower = Follow.objects.order_by('pk').first().user
+        entries = set(
+            TimelineEntry.objects.filter(user=follower)
+            .values_list('post_id', flat=True)
+        )
+        timeline.rebuild(follower)
+        self.assertEqual(entries, set(
+            TimelineEntry.objects.filter(user=follower)
+            .values_list('post_id', flat=True)
+        ))
+        self.assertTrue(search.search_ids(WORDS[0]))
+
+    def test_seed_invalidates_pages(self):
+        """После сида закэшированные страницы устаревают."""
+        before = page_cache.generations([])
+        self.seed(users=3, posts=5, comments=0, follows=1)
+        self.assertNotEqual(page_cache.generations([]), before)
+
+    def test_new_rows_after_seed(self):
+        """После сида обычные записи получают свободные id."""
+        self.seed()
+        post = Post.objects.create(
+            text='Обычная запись', author=User.objects.first()
+        )
+        self.assertGreater(post.pk, 300)
+
+    def test_copy_escaping(self):
+        """Значения для COPY экранируются, None становится \\N."""
+        rows = [(1, 'строка\tс\\табом\n', None, True)]
+        self.assertEqual(
+            CopyFile(rows).read(),
+            '1\tстрока\\tс\\\\табом\\n\t\\N\tt\n'
+        )
+
+    def test_command(self):
+        """Команда seed печатает число созданных строк."""
+        out = StringIO()
+        call_command(
+            'seed', users=5, groups=1, posts=20, comments=10, follows=2,
+            stdout=out,
+        )
+        self.assertIn('posts: 20', out.getvalue())
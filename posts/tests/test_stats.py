@@ -0,0 +1,97 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, User, UserStats
+from posts.stats import get_stats, increment
+
+
+class UserStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='stats_author')
+        cls.reader = User.objects.create_user(username='stats_reader')
+        Post.objects.create(text='Первая запись', author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author = User.objects.get(username='stats_author')
+        self.reader = User.objects.get(username='stats_reader')
+
+    def test_row_created_from_actual_counts(self):
+        """Строка счётчиков создаётся по точным значениям."""
+        stats = get_stats(self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются вместе с записями и подписками."""
+        get_stats(self.author)
+        get_stats(self.reader)
+        post = Post.objects.create(text='Вторая', author=UserStatsTest.author)
+        follow = Follow.objects.create(
+            user=UserStatsTest.reader, author=UserStatsTest.author
+        )
+        author_stats = UserStats.objects.get(user=UserStatsTest.author)
+        reader_stats = UserStats.objects.get(user=UserStatsTest.reader)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+
+        post.delete()
+        follow.delete()
+        author_stats.refresh_from_db()
+        reader_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+
+    def test_decrement_stops_at_zero(self):
+        """Уменьшение счётчика не опускает его ниже нуля."""
+        get_stats(self.author)
+        increment(UserStatsTest.author.pk, followers_count=-1, posts_count=-5)
+        stats = UserStats.objects.get(user=UserStatsTest.author)
+        self.assertEqual(stats.followers_count, 0)
+        self.assertEqual(stats.posts_count, 0)
+
+    def test_counter_failure_rolls_back_post(self):
+        """Запись и счётчик сохраняются в одной транзакции."""
+        client = Client()
+        client.force_login(UserStatsTest.author)
+        with mock.patch('posts.signals.stats.increment',
+                        side_effect=RuntimeError('сбой')):
+            with self.assertRaises(RuntimeError):
+                client.post(reverse('posts:new_post'), {'text': 'Сбой'})
+        self.assertFalse(Post.objects.filter(text='Сбой').exists())
+
+    def test_profile_uses_stats(self):
+        """Карточка автора берёт значения из строки счётчиков."""
+        get_stats(self.author)
+        UserStats.objects.filter(user=UserStatsTest.author).update(
+            followers_count=7
+        )
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'stats_author'})
+        )
+        self.assertEqual(response.context['follower_number'], 7)
+        self.assertEqual(response.context['quantity'], 1)
+
+    def test_reconcile_repairs_drift(self):
+        """reconcile_stats исправляет расхождения и создаёт строки."""
+        get_stats(self.author)
+        UserStats.objects.filter(user=UserStatsTest.author).update(
+            posts_count=42
+        )
+        out = StringIO()
+        call_command('reconcile_stats', stdout=out)
+        self.assertEqual(
+            UserStats.objects.get(user=UserStatsTest.author).posts_count, 1
+        )
+        self.assertTrue(
+            UserStats.objects.filter(user=UserStatsTest.reader).exists()
+        )
+        self.assertIn('исправлено: 1', out.getvalue())
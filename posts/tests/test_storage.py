@@ -0,0 +1,107 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts.models import Post, StoredFile, User
+from posts.storage import ContentAddressedStorage
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='storage_author')
+        cls.storage = Post._meta.get_field('image').storage
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self, name='small.gif'):
+        return Post.objects.create(
+            text='Картинка',
+            author=self.author,
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'),
+        )
+
+    def ref_count(self, name):
+        return StoredFile.objects.get(name=name).ref_count
+
+    def test_name_is_sharded_content_hash(self):
+        """Файл называется хешем содержимого и лежит в подкаталогах."""
+        digest = hashlib.sha256(SMALL_GIF).hexdigest()
+        post = self.create_post()
+        self.assertEqual(
+            post.image.name,
+            f'posts/{digest[:2]}/{digest[2:4]}/{digest}.gif'
+        )
+        self.assertTrue(os.path.exists(post.image.path))
+
+    def test_duplicates_are_stored_once_and_counted(self):
+        """Одинаковые загрузки дают один файл и счётчик ссылок."""
+        first = self.create_post('one.gif')
+        second = self.create_post('two.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(len(os.listdir(directory)), 1)
+        self.assertEqual(self.ref_count(first.image.name), 2)
+        second.delete()
+        self.assertEqual(self.ref_count(first.image.name), 1)
+
+    def test_replacing_image_moves_reference(self):
+        """Замена изображения переносит ссылку на новый файл."""
+        post = self.create_post()
+        old_name = post.image.name
+        post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\x00', 'image/gif'
+        )
+        post.save(update_fields=['image'])
+        self.assertEqual(self.ref_count(old_name), 0)
+        self.assertEqual(self.ref_count(post.image.name), 1)
+
+    def test_migrate_media_command(self):
+        """Команда переносит плоские файлы и объединяет дубликаты."""
+        flat = FileSystemStorage(location=MEDIA_ROOT)
+        names = [
+            flat.save(f'posts/legacy_{i}.gif', ContentFile(SMALL_GIF))
+            for i in range(2)
+        ]
+        posts = [
+            Post.objects.create(text='Старая', author=self.author, image=name)
+            for name in names + names[:1]
+        ]
+        devnull = open(os.devnull, 'w')
+        call_command('migrate_media', dry_run=True, stdout=devnull)
+        self.assertTrue(all(flat.exists(name) for name in names))
+        call_command('migrate_media', stdout=devnull)
+        new_names = {
+            post.image.name
+            for post in Post.objects.filter(pk__in=[p.pk for p in posts])
+        }
+        self.assertEqual(len(new_names), 1)
+        new_name = new_names.pop()
+        self.assertTrue(ContentAddressedStorage.is_content_addressed(new_name))
+        self.assertFalse(any(flat.exists(name) for name in names))
+        self.assertEqual(self.ref_count(new_name), 3)
+        self.assertFalse(StoredFile.objects.filter(name__in=names).exists())
@@ -0,0 +1,170 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import jobs, thumbnails
+from posts.models import Job, Post, User
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='thumb_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(ThumbnailTest.author)
+
+    def create_post(self, content=SMALL_GIF):
+        return Post.objects.create(
+            text='Запись с картинкой',
+            author=self.author,
+            image=SimpleUploadedFile(
+                'small.gif', content, content_type='image/gif'
+            ),
+        )
+
+    def make_gif(self, color):
+        buffer = io.BytesIO()
+        Image.new('RGB', (2, 1), color).save(buffer, 'GIF')
+        return buffer.getvalue()
+
+    def test_template_falls_back_to_original(self):
+        """Пока миниатюры нет, в ленте показывается исходный файл."""
+        post = self.create_post()
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{post.image.url}"')
+
+    @override_settings(POST_THUMBNAIL_ASYNC=False)
+    def test_ready_thumbnail_replaces_original(self):
+        """Готовая миниатюра попадает в ленту, а версия записи растёт."""
+        post = self.create_post()
+        self.guest_client.get(reverse('posts:index'))
+        thumbnails.schedule(post)
+        image = thumbnails.lookup(post.image)
+        self.assertIsNotNone(image)
+        post.refresh_from_db()
+        self.assertEqual(post.version, 1)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{image.src}"')
+        self.assertNotContains(response, f'src="{post.image.url}"')
+
+    @override_settings(
+        POST_IMAGE_WIDTHS=(480, 960), POST_IMAGE_FORMATS=('WEBP', 'JPEG')
+    )
+    def test_responsive_variants(self):
+        """Для каждой ширины есть WebP и JPEG, разметка — <picture>."""
+        post = self.create_post()
+        self.assertTrue(thumbnails.generate(post.image.name))
+        image = thumbnails.lookup(post.image)
+        self.assertEqual(
+            sorted(image.files), [
+                ('JPEG', 480), ('JPEG', 960), ('WEBP', 480), ('WEBP', 960)
+            ]
+        )
+        self.assertTrue(image.files['WEBP', 480].name.endswith('.webp'))
+        self.assertEqual(image.files['JPEG', 480].width, 480)
+        thumbnails.mark_ready([post.image.name])
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, ' 480w, ')
+        self.assertContains(response, 'loading="lazy"')
+
+    def test_new_post_gets_placeholder(self):
+        """При загрузке у записи появляется встроенная заглушка."""
+        self.authorized_client.post(reverse('posts:new_post'), {
+            'text': 'С заглушкой',
+            'image': SimpleUploadedFile(
+                'placeholder.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        })
+        post = Post.objects.get(text='С заглушкой')
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        self.assertLess(len(post.image_placeholder), 1000)
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertContains(response, post.image_placeholder)
+
+    def test_new_post_schedules_thumbnail(self):
+        """Генерация миниатюры ставится в очередь фоновых задач."""
+        self.authorized_client.post(reverse('posts:new_post'), {
+            'text': 'Новая запись',
+            'image': SimpleUploadedFile(
+                'new.gif', SMALL_GIF, content_type='image/gif'
+            ),
+        })
+        post = Post.objects.get(text='Новая запись')
+        self.assertIsNone(thumbnails.lookup(post.image))
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'posts.thumbnails.generate_task')
+        self.assertTrue(jobs.run(jobs.claim('test')[0]))
+        self.assertIsNotNone(thumbnails.lookup(post.image))
+
+    def test_regenerate_command(self):
+        """Команда создаёт миниатюры и недостающие заглушки."""
+        post = self.create_post()
+        Post.objects.create(text='Без картинки', author=self.author)
+        call_command(
+            'regenerate_thumbnails', workers=0, force=True,
+            stdout=open('/dev/null', 'w')
+        )
+        self.assertIsNotNone(thumbnails.lookup(post.image))
+        post.refresh_from_db()
+        self.assertTrue(post.image_placeholder)
+
+    def test_page_lookup_is_batched(self):
+        """Миниатюры страницы находятся одним запросом к базе."""
+        posts = [
+            self.create_post(self.make_gif(color))
+            for color in ('red', 'green', 'blue')
+        ]
+        for post in posts:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        with self.assertNumQueries(1):
+            found = thumbnails.lookup_many([post.image for post in posts])
+        self.assertEqual(len(found), 3)
+        self.assertTrue(all(found.values()))
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
+        first = posts[0]
+        self.assertEqual(
+            first.responsive_image.src, found[first.image.name].src
+        )
+
+    def test_missing_thumbnails_are_remembered(self):
+        """Отсутствие миниатюр тоже кэшируется и не ходит в базу."""
+        post = self.create_post()
+        with self.assertNumQueries(1):
+            self.assertIsNone(thumbnails.lookup(post.image))
+        with self.assertNumQueries(0):
+            self.assertIsNone(thumbnails.lookup(post.image))
@@ -0,0 +1,151 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import jobs, timeline
+from posts.models import Follow, Post, TimelineEntry, User, UserStats
+from posts.pagination import KeysetPage, KeysetPaginator
+
+
+@override_settings(FOLLOW_MERGE_MAX_AUTHORS=0)
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.old_post = Post.objects.create(
+            text='Запись до подписки', author=cls.author
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(TimelineTest.reader)
+
+    def follow(self):
+        self.reader_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'writer'})
+        )
+
+    def feed(self, **params):
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), params
+        )
+        return list(response.context['page'])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка переносит в ленту уже опубликованные записи автора."""
+        self.follow()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTest.reader, post=TimelineTest.old_post
+        ).exists())
+        self.assertEqual(self.feed(), [TimelineTest.old_post])
+
+    def test_new_post_is_fanned_out(self):
+        """Новая запись раскладывается в ленты подписчиков."""
+        self.follow()
+        post = Post.objects.create(text='Новая запись', author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.get(post=post).user, TimelineTest.reader
+        )
+        self.assertEqual(self.feed()[0], post)
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка убирает записи автора из ленты."""
+        self.follow()
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'writer'})
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTest.reader).exists()
+        )
+        self.assertEqual(self.feed(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_heavy_author_merged_on_read(self):
+        """Записи популярных авторов подмешиваются при чтении."""
+        self.follow()
+        post = Post.objects.create(text='Новая запись', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [post, TimelineTest.old_post])
+        self.assertEqual(self.feed(before='0_0'), [])
+
+    def test_keyset_follow_feed(self):
+        """Лента подписок поддерживает курсоры."""
+        self.follow()
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), {'after': '0_0'}
+        )
+        self.assertIsInstance(response.context['page'], KeysetPage)
+        self.assertEqual(
+            list(response.context['page']), [TimelineTest.old_post]
+        )
+
+    def test_rebuild_timeline_command(self):
+        """Команда rebuild_timeline восстанавливает ленту с нуля."""
+        Follow.objects.create(
+            user=TimelineTest.reader, author=TimelineTest.author
+        )
+        TimelineEntry.objects.all().delete()
+        call_command('rebuild_timeline', 'reader', stdout=StringIO())
+        self.assertEqual(self.feed(), [TimelineTest.old_post])
+
+    def test_backfill_counts_only_new_entries(self):
+        """Повторный перенос записей автора ничего не добавляет."""
+        self.follow()
+        self.assertEqual(
+            timeline.add_author(TimelineTest.reader.pk, self.author.pk), 0
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_backfilled_when_no_longer_heavy(self):
+        """Записи, вышедшие у популярного автора, попадают в ленты потом."""
+        self.follow()
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=TimelineTest.author)
+        post = Post.objects.create(text='Новая запись', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=other).delete()
+        self.assertEqual(jobs.work(burst=True, poll_interval=0), 1)
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=TimelineTest.reader, post=post
+        ).exists())
+
+    @override_settings(TIMELINE_BACKFILL=2)
+    def test_deep_pages_read_join(self):
+        """Страницы глубже TIMELINE_BACKFILL не теряют старые записи."""
+        for number in range(3):
+            Post.objects.create(text=f'Запись {number}', author=self.author)
+        self.follow()
+        self.assertEqual(TimelineEntry.objects.count(), 2)
+        expected = list(
+            Post.objects.filter(author=self.author)
+            .order_by('-pub_date', '-pk')
+        )
+        feed = timeline.FollowFeed(TimelineTest.reader)
+        self.assertEqual(feed.count(), 4)
+        self.assertEqual(feed[0:2] + feed[2:4], expected)
+        paginator = KeysetPaginator(feed, 1)
+        page = paginator.page()
+        walked = list(page)
+        while page.has_next():
+            page = paginator.get_page(before=page.next_cursor)
+            walked += list(page)
+        self.assertEqual(walked, expected)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_heaviness_read_from_stats(self):
+        """Популярность автора берётся из UserStats, а не из подсчёта."""
+        self.follow()
+        self.assertEqual(timeline.heavy_authors(TimelineTest.reader), [])
+        UserStats.objects.filter(user=TimelineTest.author).update(
+            followers_count=5
+        )
+        self.assertEqual(
+            timeline.heavy_authors(TimelineTest.reader),
+            [TimelineTest.author.pk],
+        )
+        post = Post.objects.create(text='Новая запись', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
@@ -0,0 +1,215 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from posts import search, stats, transfer
+from posts.models import (Comment, Follow, Group, Post, StoredFile,
+                          TimelineEntry, User)
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_gif():
+    buffer = io.BytesIO()
+    Image.new('RGB', (2, 1), 'blue').save(buffer, 'GIF')
+    return SimpleUploadedFile('image.gif', buffer.getvalue(), 'image/gif')
+
+
+def snapshot():
+    return {
+        'posts': list(Post.objects.order_by('pk').values_list(
+            'pk', 'text', 'pub_date', 'author__username', 'group__slug',
+            'image', 'comments_count',
+        )),
+        'comments': list(Comment.objects.order_by('pk').values_list(
+            'post__text', 'author__username', 'text', 'created',
+        )),
+        'follows': list(Follow.objects.order_by('pk').values_list(
+            'user__username', 'author__username',
+        )),
+        'timeline': sorted(TimelineEntry.objects.values_list(
+            'user__username', 'post__text',
+        )),
+        'stats': list(User.objects.order_by('pk').values_list(
+            'username', 'password', 'stats__posts_count',
+            'stats__followers_count', 'stats__following_count',
+        )),
+    }
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TransferTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'dump.jsonl')
+        self.media_dir = os.path.join(self.directory, 'media')
+        reader = User.objects.create_user(username='reader', password='x')
+        author = User.objects.create_user(username='author')
+        group = Group.objects.create(
+            title='Группа', slug='transfer', description='Описание'
+        )
+        for number in range(5):
+            post = Post.objects.create(
+                text=f'Запись номер {number}', author=author,
+                group=group if number % 2 else None,
+            )
+            Comment.objects.create(post=post, author=reader, text='Да')
+        self.image_post = Post.objects.create(
+            text='Картинка', author=author, image=make_gif()
+        )
+        Follow.objects.create(user=reader, author=author)
+
+    def export(self, path=None):
+        with transfer.open_file(path or self.path, 'w') as output:
+            return transfer.export(output, media_dir=self.media_dir)
+
+    def wipe(self):
+        storage = Post._meta.get_field('image').storage
+        storage.delete(self.image_post.image.name)
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        StoredFile.objects.all().delete()
+
+    def test_round_trip(self):
+        """После выгрузки и загрузки в пустую базу всё как было."""
+        stats.reconcile(User.objects.all())
+        before = snapshot()
+        written = self.export()
+        self.assertEqual(written['post'], 6)
+        self.assertEqual(written['files'], 1)
+        self.wipe()
+        transfer.Importer(self.path, media_dir=self.media_dir).run()
+        self.assertEqual(snapshot(), before)
+        name = self.image_post.image.name
+        self.assertTrue(Post._meta.get_field('image').storage.exists(name))
+        self.assertEqual(StoredFile.objects.get(name=name).ref_count, 1)
+        self.assertTrue(search.search_ids('Картинка'))
+        self.assertTrue(
+            User.objects.get(username='reader').check_password('x')
+        )
+
+    def test_occupied_ids_are_shifted(self):
+        """Если id выгрузки заняты, строки получают новые id и связи."""
+        self.export()
+        Follow.objects.all().delete()
+        User.objects.filter(username='reader').update(username='old_reader')
+        User.objects.filter(username='author').update(username='old_author')
+        Group.objects.update(slug='old')
+        posts = Post.objects.count()
+        transfer.Importer(self.path, media_dir=self.media_dir).run()
+        self.assertEqual(Post.objects.count(), posts * 2)
+        reader = User.objects.get(username='reader')
+        author = User.objects.get(username='author')
+        self.assertEqual(reader.follower.get().author, author)
+        self.assertEqual(
+            Comment.objects.filter(post__author=author).count(), 5
+        )
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=reader).count(), 6
+        )
+        self.assertEqual(author.stats.posts_count, 6)
+
+    def test_live_rows_during_import(self):
+        """Строки, созданные во время импорта, не занимают его id."""
+        self.export()
+        Follow.objects.all().delete()
+        User.objects.filter(username='reader').update(username='old_reader')
+        User.objects.filter(username='author').update(username='old_author')
+        Group.objects.update(slug='old')
+        importer = transfer.Importer(
+            self.path, media_dir=self.media_dir, batch_size=2
+        )
+        insert = importer.insert
+
+        def fail_on_posts(model, records):
+            if model is Post:
+                raise RuntimeError('обрыв')
+            return insert(model, records)
+
+        with mock.patch.object(importer, 'insert', fail_on_posts):
+            with self.assertRaises(RuntimeError):
+                importer.run()
+        live = Post.objects.create(
+            text='Живая запись', author=User.objects.get(username='old_author')
+        )
+        self.assertGreater(live.pk, importer.imported_range('post')[1])
+        transfer.Importer(
+            self.path, media_dir=self.media_dir, batch_size=2
+        ).run()
+        self.assertEqual(
+            Post.objects.filter(author__username='author').count(), 6
+        )
+        self.assertEqual(
+            Comment.objects.filter(post__author__username='author').count(), 5
+        )
+
+    def test_resume_after_failure(self):
+        """Прерванный импорт продолжается без дублей."""
+        self.export()
+        self.wipe()
+        importer = transfer.Importer(
+            self.path, media_dir=self.media_dir, batch_size=2
+        )
+        insert = importer.insert
+        calls = []
+
+        def fail_on_fourth(model, records):
+            calls.append(model)
+            if len(calls) == 4:
+                raise RuntimeError('обрыв')
+            return insert(model, records)
+
+        with mock.patch.object(importer, 'insert', fail_on_fourth):
+            with self.assertRaises(RuntimeError):
+                importer.run()
+        self.assertFalse(Comment.objects.exists())
+        # Пачка закоммичена, но позиция не сохранена: строки пропускаются.
+        with open(importer.state_path) as state_file:
+            state = json.load(state_file)
+        with open(self.path, 'rb') as source:
+            state['position'] = len(source.readline())
+        with open(importer.state_path, 'w') as state_file:
+            json.dump(state, state_file)
+        inserted = transfer.Importer(
+            self.path, media_dir=self.media_dir, batch_size=2
+        ).run()
+        self.assertEqual(User.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 6)
+        self.assertEqual(Comment.objects.count(), 5)
+        self.assertEqual(inserted['comment'], 5)
+        self.assertEqual(inserted['post'], 6)
+
+    def test_commands_and_conflicts(self):
+        """Команды работают с .gz, совпадение имён останавливает импорт."""
+        path = self.path + '.gz'
+        out = io.StringIO()
+        call_command('export_data', path, media=self.media_dir, stdout=out)
+        self.assertIn('post: 6', out.getvalue())
+        with self.assertRaisesMessage(CommandError, 'reader'):
+            call_command('import_data', path, stdout=io.StringIO())
+        self.wipe()
+        os.remove(path + '.state.json')
+        call_command(
+            'import_data', path, media=self.media_dir, stdout=out
+        )
+        self.assertEqual(Post.objects.count(), 6)
+        with self.assertRaisesMessage(CommandError, 'уже завершён'):
+            call_command('import_data', path, stdout=io.StringIO())
@@ -0,0 +1,84 @@
+from django.core.cache import caches
+from django.test import TestCase
+
+from yatube.cache import TwoTierCache, check_shared_cache
+
+
+def make_cache(name, **options):
+    return TwoTierCache(name, {
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'GENERATION_CHECK_INTERVAL': 0,
+            **options,
+        },
+    })
+
+
+class TwoTierCacheTest(TestCase):
+    def setUp(self):
+        self.first = make_cache('first_process')
+        self.second = make_cache('second_process')
+        self.first.clear()
+
+    def test_value_shared_between_processes(self):
+        """Значение, записанное одним процессом, видно другому."""
+        hits = self.second.stats()['shared_hits']
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        self.assertEqual(self.second.stats()['shared_hits'], hits + 1)
+
+    def test_repeated_reads_served_locally(self):
+        """Повторное чтение не обращается к общему кэшу."""
+        self.first.set('key', 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(self.first.get('key'), 'value')
+
+    def test_delete_invalidates_other_processes(self):
+        """Удаление сбрасывает локальные копии в других процессах."""
+        self.first.set('key', 'value')
+        self.second.get('key')
+        self.first.delete('key')
+        self.assertIsNone(self.second.get('key'))
+
+    def test_incr_invalidates_other_processes(self):
+        """incr виден другим процессам сразу."""
+        self.first.set('counter', 1)
+        self.second.get('counter')
+        self.first.incr('counter')
+        self.assertEqual(self.second.get('counter'), 2)
+
+    def test_local_tier_is_bounded(self):
+        """Локальный уровень вытесняет самые старые записи."""
+        cache = make_cache('bounded_process', LOCAL_MAX_ENTRIES=2)
+        cache.store.clear()
+        cache.set_many({'a': 1, 'b': 2, 'c': 3})
+        self.assertEqual(list(cache.store.entries), [
+            caches['shared'].make_key('b'),
+            caches['shared'].make_key('c'),
+        ])
+        self.assertEqual(cache.get_many(['a', 'b', 'c']), {
+            'a': 1, 'b': 2, 'c': 3
+        })
+
+    def test_incr_keeps_other_namespaces(self):
+        """incr счётчика не сбрасывает локальные копии других ключей."""
+        self.first.set('page_gen:index', 1)
+        self.first.set('page:hash', 'страница')
+        self.second.get('page:hash')
+        caches['shared'].delete('page:hash')
+        self.first.incr('page_gen:index')
+        self.assertEqual(self.second.get('page:hash'), 'страница')
+        self.assertEqual(self.second.get('page_gen:index'), 2)
+
+    def test_clear_invalidates_everything(self):
+        """clear сбрасывает локальные копии во всех процессах."""
+        self.first.set('page:hash', 'страница')
+        self.second.get('page:hash')
+        self.first.clear()
+        self.assertIsNone(self.second.get('page:hash'))
+
+    def test_local_shared_cache_warning(self):
+        """Проверка деплоя предупреждает о LocMemCache в общем уровне."""
+        warnings = check_shared_cache(None)
+        self.assertEqual([warning.id for warning in warnings], ['yatube.W001'])
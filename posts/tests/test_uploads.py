@@ -0,0 +1,127 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts.forms import PostForm
+from posts.images import LimitedUploadHandler
+from posts.models import Post, User
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+def make_jpeg(width, height, orientation=None):
+    image = Image.new('RGB', (width, height), 'red')
+    exif = Image.Exif()
+    exif[MAKE] = 'Камера'
+    if orientation:
+        exif[ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile(
+        'photo.jpg', buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class UploadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='upload_author')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def clean(self, upload):
+        form = PostForm(data={'text': 'Фото'}, files={'image': upload})
+        return form, form.is_valid()
+
+    @override_settings(POST_IMAGE_MAX_SIDE=500)
+    def test_large_image_is_downscaled_and_rotated(self):
+        """Большое фото уменьшается, поворачивается по EXIF и теряет EXIF."""
+        form, valid = self.clean(make_jpeg(1600, 1200, orientation=6))
+        self.assertTrue(valid, form.errors)
+        with Image.open(form.cleaned_data['image']) as image:
+            self.assertEqual(max(image.size), 500)
+            self.assertGreater(image.height, image.width)
+            self.assertFalse(image.getexif())
+
+    @override_settings(POST_IMAGE_MAX_BYTES=100)
+    def test_byte_limit(self):
+        """Файл больше лимита в байтах отклоняется."""
+        form, valid = self.clean(make_jpeg(100, 100))
+        self.assertFalse(valid)
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'file_too_large')
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100 * 100)
+    def test_pixel_limit(self):
+        """Изображение с лишними пикселями отклоняется до декодирования."""
+        form, valid = self.clean(make_jpeg(101, 100))
+        self.assertFalse(valid)
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'too_many_pixels')
+
+    @override_settings(POST_IMAGE_MAX_DECODED_PIXELS=100 * 100)
+    def test_decoded_pixel_limit(self):
+        """PNG декодируется целиком, поэтому и лимит у него меньше."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (101, 100), 'red').save(buffer, 'PNG')
+        form, valid = self.clean(SimpleUploadedFile(
+            'image.png', buffer.getvalue(), content_type='image/png'
+        ))
+        self.assertFalse(valid)
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'too_many_pixels')
+        form, valid = self.clean(make_jpeg(101, 100))
+        self.assertTrue(valid, form.errors)
+
+    @override_settings(POST_IMAGE_MAX_BYTES=10)
+    def test_upload_handler_stops_writing(self):
+        """Обработчик загрузки не пишет на диск байты сверх лимита."""
+        handler = LimitedUploadHandler()
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+        handler.receive_data_chunk(b'x' * 8, 0)
+        handler.receive_data_chunk(b'x' * 8, 8)
+        upload = handler.file_complete(16)
+        self.assertEqual(upload.size, 16)
+        self.assertEqual(upload.read(), b'')
+        upload.close()
+
+    @override_settings(POST_IMAGE_MAX_BYTES=100)
+    def test_oversized_upload_rejected_by_view(self):
+        """Слишком большой файл отклоняется формой new_post."""
+        client = Client()
+        client.force_login(UploadTest.author)
+        response = client.post(reverse('posts:new_post'), {
+            'text': 'Большой файл', 'image': make_jpeg(100, 100),
+        })
+        self.assertEqual(
+            response.context['form'].errors.as_data()['image'][0].code,
+            'file_too_large',
+        )
+        self.assertFalse(Post.objects.filter(text='Большой файл').exists())
+
+    def test_uploaded_post_stores_normalized_file(self):
+        """Через new_post сохраняется уже очищенный файл."""
+        client = Client()
+        client.force_login(UploadTest.author)
+        client.post(reverse('posts:new_post'), {
+            'text': 'Загрузка с EXIF',
+            'image': make_jpeg(40, 20, orientation=8),
+        })
+        post = Post.objects.get(text='Загрузка с EXIF')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertFalse(image.getexif())
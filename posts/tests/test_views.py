@@ -243,6 +243,7 @@ class IndexPaginatorTest(TestCase):
             time.sleep(0.1)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_first_page_contains_ten_records(self):
@@ -268,6 +269,7 @@ class IndexPaginatorTest(TestCase):
 
 class CacheIndexTest(TestCase):
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
 
     def test_cache_index_page(self):
@@ -280,28 +282,37 @@ class CacheIndexTest(TestCase):
         )
 
         first_response = self.guest_client.get(reverse('posts:index'))
+        second_response = self.guest_client.get(reverse('posts:index'))
+        self.assertIsNotNone(first_response.context)
+        self.assertIsNone(second_response.context)
+        self.assertEqual(
+            first_response.content,
+            second_response.content
+        )
 
+    def test_new_post_invalidates_index_cache(self):
+        """Новая запись сразу появляется на закэшированной главной"""
+        first_response = self.guest_client.get(reverse('posts:index'))
         Post.objects.create(
             text='Тестовый текст второго поста',
             author=User.objects.create(
                 username='test_username2'
             )
         )
-
         second_response = self.guest_client.get(reverse('posts:index'))
-        first_response_content = first_response.content
-        second_response_content = second_response.content
-        self.assertEqual(
-            first_response_content,
-            second_response_content
-        )
-        cache.clear()
-        third_response = self.guest_client.get(reverse('posts:index'))
-        third_response_content = third_response.content
         self.assertNotEqual(
-            first_response_content,
-            third_response_content
+            first_response.content,
+            second_response.content
         )
+        self.assertContains(second_response, 'Тестовый текст второго поста')
+
+    def test_authorized_pages_are_not_cached(self):
+        """Страницы для авторизованных пользователей не кэшируются"""
+        user = User.objects.create(username='test_username3')
+        self.guest_client.force_login(user)
+        self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertIsNotNone(response.context)
 
 
 class FollowTests(TestCase):
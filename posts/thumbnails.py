@@ -0,0 +1,282 @@
+import logging
+
+from django.conf import settings
+from django.db.models import F
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from . import jobs, page_cache
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+ASPECT_RATIO = 960 / 339
+OPTIONS = {'crop': 'center', 'upscale': True}
+CONTENT_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, умеющий искать готовые миниатюры без генерации."""
+
+    def normalize_options(self, source, options):
+        # Те же умолчания, что в ThumbnailBackend.get_thumbnail:
+        # от них зависит имя файла миниатюры.
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def thumbnail_file(self, source, geometry_string, **options):
+        """Файл миниатюры, под которым её ищет get_thumbnail."""
+        options = self.normalize_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = PostThumbnailBackend()
+
+
+def source_file(image):
+    """Исходник для sorl в хранилище поля Post.image.
+
+    От класса хранилища зависит ключ миниатюры, поэтому имя файла
+    и FieldFile должны давать один и тот же ключ.
+    """
+    return ImageFile(image, Post._meta.get_field('image').storage)
+
+
+def geometry(width):
+    return f'{width}x{round(width / ASPECT_RATIO)}'
+
+
+def formats():
+    # WebP есть не во всех сборках Pillow; JPEG доступен всегда.
+    return [
+        name for name in settings.POST_IMAGE_FORMATS
+        if name != 'WEBP' or features.check('webp')
+    ]
+
+
+def variants():
+    """Пары (формат, ширина) всех миниатюр одного изображения."""
+    return [
+        (name, width)
+        for name in formats()
+        for width in sorted(settings.POST_IMAGE_WIDTHS)
+    ]
+
+
+class ResponsiveImage:
+    """Готовые миниатюры изображения для <picture> и srcset."""
+
+    def __init__(self, files):
+        self.files = files
+
+    def srcset(self, format_name):
+        return ', '.join(
+            f'{image.url} {width}w'
+            for (name, width), image in sorted(self.files.items())
+            if name == format_name
+        )
+
+    @property
+    def sources(self):
+        """Альтернативы для <source>: все форматы, кроме JPEG."""
+        return [
+            {'type': CONTENT_TYPES[name], 'srcset': self.srcset(name)}
+            for name in formats() if name != 'JPEG'
+        ]
+
+    @property
+    def jpeg_srcset(self):
+        return self.srcset('JPEG')
+
+    @property
+    def src(self):
+        width = max(settings.POST_IMAGE_WIDTHS)
+        return self.files['JPEG', width].url
+
+    @property
+    def width(self):
+        return max(settings.POST_IMAGE_WIDTHS)
+
+    @property
+    def height(self):
+        return round(self.width / ASPECT_RATIO)
+
+
+def get_raw_many(keys):
+    """Значения KV-хранилища sorl: один get_many и не больше одного запроса.
+
+    Повторяет KVStore._get_raw из cached_db, включая запоминание
+    отсутствующих ключей; другие хранилища читаются по одному ключу.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        stored = dict(
+            KVStoreModel.objects.filter(key__in=missing)
+            .values_list('key', 'value')
+        )
+        fetched = {
+            key: stored.get(key, cached_db_kvstore.EMPTY_VALUE)
+            for key in missing
+        }
+        kvstore.cache.set_many(
+            fetched, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(fetched)
+    empty = cached_db_kvstore.EMPTY_VALUE
+    return {
+        key: None if value == empty else value
+        for key, value in values.items()
+    }
+
+
+def lookup_many(images):
+    """Готовые миниатюры нескольких изображений за один проход.
+
+    Возвращает словарь {имя исходного файла: ResponsiveImage или None}.
+    """
+    keys = {}
+    for image in images:
+        source = source_file(image)
+        keys[source.name] = {
+            (name, width): add_prefix(backend.thumbnail_file(
+                source, geometry(width), format=name, **OPTIONS
+            ).key)
+            for name, width in variants()
+        }
+    values = get_raw_many([
+        key for variant_keys in keys.values()
+        for key in variant_keys.values()
+    ])
+    found = {}
+    for source_name, variant_keys in keys.items():
+        raw = {
+            variant: values.get(key)
+            for variant, key in variant_keys.items()
+        }
+        found[source_name] = ResponsiveImage({
+            variant: deserialize_image_file(value)
+            for variant, value in raw.items()
+        }) if all(raw.values()) else None
+    return found
+
+
+def lookup(image):
+    """Готовые миниатюры изображения записи или None, если их нет."""
+    return lookup_many([image])[source_file(image).name]
+
+
+def prefetch(posts):
+    """Запоминает в post.responsive_image миниатюры всех записей.
+
+    Шаблон карточки берёт их оттуда и не обращается к хранилищу
+    для каждой записи отдельно.
+    """
+    posts = [post for post in posts if post.image]
+    found = lookup_many([post.image for post in posts])
+    for post in posts:
+        post.responsive_image = found[source_file(post.image).name]
+    return posts
+
+
+def generate(name, force=False):
+    """Создаёт все миниатюры; возвращает True, если они готовы."""
+    source = source_file(name)
+    try:
+        if force:
+            backend.delete(source, delete_file=False)
+        for format_name, width in variants():
+            backend.get_thumbnail(
+                source, geometry(width), format=format_name, **OPTIONS
+            )
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+        return False
+    return lookup(name) is not None
+
+
+def thumbnail_names(names):
+    """Имена файлов миниатюр, которые sorl помнит для исходников."""
+    lists = get_raw_many([
+        add_prefix(source_file(name).key, 'thumbnails') for name in names
+    ])
+    keys = [
+        add_prefix(key)
+        for value in lists.values() if value
+        for key in deserialize(value)
+    ]
+    return [
+        deserialize_image_file(value).name
+        for value in get_raw_many(keys).values() if value
+    ]
+
+
+def delete(name):
+    """Удаляет исходный файл, его миниатюры и записи о них в sorl."""
+    backend.delete(source_file(name))
+
+
+def delete_thumbnail_file(name):
+    thumbnail = ImageFile(name, default.storage)
+    default.kvstore.delete(thumbnail, delete_thumbnails=False)
+    thumbnail.delete()
+
+
+def bump_versions(names):
+    """Меняет версию записей, чтобы их карточки отрисовались заново."""
+    return Post.objects.filter(image__in=names).update(
+        version=F('version') + 1
+    )
+
+
+def mark_ready(names):
+    bump_versions(names)
+    for post in Post.objects.filter(image__in=names).only(
+        'author_id', 'group_id'
+    ):
+        page_cache.invalidate_post_pages(post)
+
+
+@jobs.task
+def generate_task(name):
+    if not Post.objects.filter(image=name).exists():
+        return
+    if not generate(name):
+        raise RuntimeError(f'Не удалось создать миниатюры {name}')
+    mark_ready([name])
+
+
+def schedule(post):
+    """Ставит создание миниатюры записи в очередь фоновых задач.
+
+    До её появления шаблон показывает исходное изображение. При
+    POST_THUMBNAIL_ASYNC = False миниатюра создаётся сразу.
+    """
+    if not post.image:
+        return
+    name = post.image.name
+    if not settings.POST_THUMBNAIL_ASYNC:
+        if generate(name):
+            mark_ready([name])
+        return
+    generate_task.delay(name)
@@ -0,0 +1,263 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+
+from . import jobs
+from .models import Follow, Post, TimelineEntry, User, UserStats
+from .stats import get_stats
+from .pagination import seek_filter, seek_queryset
+
+BATCH_SIZE = 1000
+
+
+def _bulk_insert(entries):
+    """Вставляет записи ленты пачками и возвращает число новых.
+
+    Существующие пары отсеиваются заранее: bulk_create с
+    ignore_conflicts не сообщает, сколько строк он пропустил.
+    Конфликты всё равно игнорируются — на случай параллельной вставки.
+    """
+    entries = iter(entries)
+    created = 0
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return created
+        existing = set(
+            TimelineEntry.objects.filter(
+                user_id__in={entry.user_id for entry in batch},
+                post_id__in={entry.post_id for entry in batch},
+            ).values_list('user_id', 'post_id')
+        )
+        batch = [
+            entry for entry in batch
+            if (entry.user_id, entry.post_id) not in existing
+        ]
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        created += len(batch)
+
+
+def followers_count(author_id):
+    """Подписчики автора из UserStats; строка создаётся при нужде."""
+    return get_stats(User(pk=author_id)).followers_count
+
+
+def is_heavy(author_id):
+    """Авторов с большим числом подписчиков в ленты не раскладываем."""
+    return followers_count(author_id) > settings.TIMELINE_FANOUT_LIMIT
+
+
+def heavy_authors(user):
+    """id авторов из подписок user, чьи записи подмешиваются при чтении.
+
+    Строка UserStats есть у каждого автора, для которого вызывался
+    is_heavy, то есть у каждого, на кого подписывались.
+    """
+    return list(
+        UserStats.objects.filter(
+            user__following__user=user,
+            followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True)
+    )
+
+
+def fan_out(post):
+    """Раскладывает новую запись по лентам подписчиков автора."""
+    if is_heavy(post.author_id):
+        return 0
+    follower_ids = (
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+        .iterator()
+    )
+    return _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in follower_ids
+    )
+
+
+def add_author(user_id, author_id):
+    """После подписки переносит в ленту последние записи автора."""
+    if is_heavy(author_id):
+        return 0
+    return _backfill(user_id, author_id)
+
+
+def _backfill(user_id, author_id):
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .order_by('-pub_date', '-pk')
+        .values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    )
+    return _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    )
+
+
+@jobs.task
+def backfill_followers(author_id):
+    """Переносит последние записи автора в ленты всех подписчиков.
+
+    Записи, вышедшие, пока у автора было больше TIMELINE_FANOUT_LIMIT
+    подписчиков, в ленты не раскладывались; без этой задачи они
+    пропали бы из лент, как только автор стал бы обычным.
+    """
+    if is_heavy(author_id):
+        return 0
+    follower_ids = (
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+        .iterator()
+    )
+    return sum(_backfill(user_id, author_id) for user_id in follower_ids)
+
+
+def author_unfollowed(author_id):
+    """Ставит backfill_followers, если автор только что стал обычным.
+
+    Строку UserStats здесь не создаём: отписка бывает и каскадом
+    при удалении самого автора.
+    """
+    followers = (
+        UserStats.objects.filter(user_id=author_id)
+        .values_list('followers_count', flat=True).first()
+    )
+    if followers == settings.TIMELINE_FANOUT_LIMIT:
+        backfill_followers.delay(author_id)
+
+
+def remove_author(user_id, author_id):
+    """После отписки убирает записи автора из ленты."""
+    post_ids = Post.objects.filter(author_id=author_id).values('pk')
+    return TimelineEntry.objects.filter(
+        user_id=user_id, post__in=post_ids
+    ).delete()[0]
+
+
+def rebuild(user):
+    """Собирает ленту пользователя заново из его подписок."""
+    TimelineEntry.objects.filter(user=user).delete()
+    return sum(
+        add_author(user.pk, author_id)
+        for author_id in Follow.objects.filter(user=user)
+        .values_list('author_id', flat=True)
+    )
+
+
+def _merge(*sources):
+    """Сливает отсортированные от новых к старым списки записей."""
+    seen = set()
+    merged = []
+    for post in heapq.merge(
+        *sources, key=lambda post: (post.pub_date, post.pk), reverse=True
+    ):
+        if post.pk not in seen:
+            seen.add(post.pk)
+            merged.append(post)
+    return merged
+
+
+class FollowFeed:
+    """Лента подписок, читаемая из материализованной таблицы.
+
+    Записи авторов с большим числом подписчиков в таблицу не попадают
+    и подмешиваются при чтении. Объект годится как для Paginator
+    (count и срезы), так и для KeysetPaginator (seek).
+
+    При подписке в таблицу переносятся TIMELINE_BACKFILL последних
+    записей автора, а дальше — все новые. Поэтому первые
+    TIMELINE_BACKFILL позиций ленты точны, а более глубокие страницы
+    читаются соединением с подписками, как до появления таблицы.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.heavy = heavy_authors(user)
+
+    def _entries(self):
+        return (
+            TimelineEntry.objects.filter(user=self.user)
+            .select_related('post__author', 'post__group')
+        )
+
+    def _heavy_posts(self):
+        return (
+            Post.objects.filter(author__in=self.heavy)
+            .select_related('author', 'group')
+        )
+
+    def _joined(self):
+        return (
+            Post.objects.filter(author__following__user=self.user)
+            .select_related('author', 'group')
+        )
+
+    def _within_depth(self, cursor, limit):
+        """Помещается ли страница за курсором в точную часть ленты."""
+        depth = settings.TIMELINE_BACKFILL
+        if limit is None or limit > depth:
+            return False
+        if cursor is None:
+            return True
+        newer = seek_filter(
+            self._entries(), after=cursor, pk_field='post_id'
+        )[:depth].count()
+        if self.heavy:
+            newer += seek_filter(
+                self._heavy_posts(), after=cursor
+            )[:depth].count()
+        return newer + limit < depth
+
+    def count(self):
+        total = self._entries().count()
+        if self.heavy:
+            total += self._heavy_posts().exclude(
+                timeline_entries__user=self.user
+            ).count()
+        # Пока записей меньше TIMELINE_BACKFILL, ни у одного автора
+        # не обрезаны старые записи и таблица полна.
+        if total < settings.TIMELINE_BACKFILL:
+            return total
+        return self._joined().count()
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if index.stop is None or index.stop > settings.TIMELINE_BACKFILL:
+            return list(
+                self._joined().order_by('-pub_date', '-pk')[index]
+            )
+        entries = self._entries().order_by('-pub_date', '-post')
+        if not self.heavy:
+            return [entry.post for entry in entries[index]]
+        stop = index.stop
+        posts = _merge(
+            [entry.post for entry in entries[:stop]],
+            self._heavy_posts().order_by('-pub_date', '-pk')[:stop],
+        )
+        return posts[index]
+
+    def seek(self, before=None, after=None, limit=None):
+        if not self._within_depth(before or after, limit):
+            return seek_queryset(
+                self._joined(), before=before, after=after, limit=limit
+            )
+        posts = [
+            entry.post for entry in seek_queryset(
+                self._entries(), before=before, after=after,
+                limit=limit, pk_field='post_id',
+            )
+        ]
+        if not self.heavy:
+            return posts
+        posts = _merge(posts, seek_queryset(
+            self._heavy_posts(), before=before, after=after, limit=limit
+        ))
+        if after is not None:
+            return posts[-limit:]
+        return posts[:limit]
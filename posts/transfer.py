@@ -0,0 +1,429 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+from collections import Counter
+from datetime import datetime
+
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+from django.db.models import Count, IntegerField, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils._os import safe_join
+from django.utils.dateparse import parse_datetime
+
+from . import media, page_cache, search, stats
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+from .seeding import fill_timeline, next_id, write_rows
+
+logger = logging.getLogger(__name__)
+
+FORMAT = 'yatube-jsonl'
+VERSION = 1
+
+# Порядок важен: строка ссылается только на модели выше неё.
+FIELDS = {
+    User: [
+        'username', 'password', 'first_name', 'last_name', 'email',
+        'is_staff', 'is_active', 'is_superuser', 'date_joined', 'last_login',
+    ],
+    Group: ['title', 'slug', 'description'],
+    Post: [
+        'text', 'pub_date', 'author', 'group', 'image', 'image_placeholder',
+    ],
+    Comment: ['post', 'author', 'text', 'created'],
+    Follow: ['user', 'author'],
+}
+
+# Поля без значения по умолчанию в базе; счётчики пересчитываются
+# в конце импорта.
+CONSTANTS = {
+    Post: {'comments_count': 0, 'version': 0},
+}
+
+# Уникальные поля, которые могут совпасть с уже существующими строками.
+NATURAL_KEYS = {User: 'username', Group: 'slug'}
+
+MODELS = {model._meta.model_name: model for model in FIELDS}
+
+
+class TransferError(ValueError):
+    pass
+
+
+def open_file(path, mode):
+    """Файл в двоичном режиме; .gz сжимается и распаковывается на лету."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 'b')
+    return open(path, mode + 'b')
+
+
+def id_ranges():
+    ranges = {}
+    for name, model in MODELS.items():
+        bounds = model.objects.aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is not None:
+            ranges[name] = [bounds['first'], bounds['last']]
+    return ranges
+
+
+def export(output, media_dir=None, batch_size=2000):
+    """Пишет в output заголовок и по строке JSON на объект.
+
+    Всё читается в одной транзакции, на PostgreSQL — с REPEATABLE
+    READ, чтобы выгрузка была согласованным снимком. Изображения
+    копируются в media_dir под теми же именами. Возвращает число
+    выгруженных строк по моделям и число скопированных файлов.
+    """
+    written = Counter()
+    storage = Post._meta.get_field('image').storage
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ'
+                )
+        ranges = id_ranges()
+        write_line(output, {
+            'format': FORMAT, 'version': VERSION, 'ids': ranges,
+        })
+        for name, model in MODELS.items():
+            if name not in ranges:
+                continue
+            fields = [
+                model._meta.get_field(field).attname
+                for field in FIELDS[model]
+            ]
+            rows = (
+                model.objects.filter(pk__lte=ranges[name][1])
+                .order_by('pk').values_list('pk', *fields)
+                .iterator(chunk_size=batch_size)
+            )
+            for pk, *values in rows:
+                record = dict(zip(FIELDS[model], values))
+                write_line(output, {'model': name, 'id': pk, **record})
+                written[name] += 1
+                if media_dir and record.get('image'):
+                    written['files'] += copy_file(
+                        storage, record['image'], media_dir
+                    )
+    return dict(written)
+
+
+class Encoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder, но даты с микросекундами.
+
+    Обычный кодировщик обрезает их до миллисекунд, и порядок записей
+    с близкими датами в курсорной пагинации после загрузки бы поплыл.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def write_line(output, record):
+    output.write(json.dumps(
+        record, cls=Encoder, ensure_ascii=False
+    ).encode() + b'\n')
+
+
+def copy_file(storage, name, media_dir):
+    target = safe_join(media_dir, name)
+    if os.path.exists(target):
+        return 0
+    if not storage.exists(name):
+        logger.warning('Нет файла изображения %s', name)
+        return 0
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with storage.open(name) as source, open(target, 'wb') as copy:
+        shutil.copyfileobj(source, copy)
+    return 1
+
+
+class IdMap:
+    """Переводит id из выгрузки в id базы сдвигом на offset.
+
+    Сдвиг выбирается один раз на весь импорт: ноль, если диапазон id
+    выгрузки в базе свободен (id и адреса записей сохраняются), иначе
+    так, чтобы новые id шли после существующих. Памяти это не требует
+    при любом числе строк, а сдвиги хранятся в файле состояния.
+    """
+
+    def __init__(self, offset=0):
+        self.offset = offset
+
+    def __call__(self, old_id):
+        return None if old_id is None else old_id + self.offset
+
+    @classmethod
+    def choose(cls, model, bounds):
+        if bounds is None:
+            return cls()
+        first, last = bounds
+        if not model.objects.filter(pk__range=(first, last)).exists():
+            return cls()
+        return cls(next_id(model) - first)
+
+
+def reserve_ids(model, last):
+    """Переносит счётчик id модели за last, не уменьшая его."""
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = model._meta.pk.column
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'SELECT setval(pg_get_serial_sequence(%s, %s), '
+                f'GREATEST(%s, (SELECT COALESCE(MAX('
+                f'{connection.ops.quote_name(column)}), 1) FROM {table})))',
+                [model._meta.db_table, column, last],
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                'UPDATE sqlite_sequence SET seq = MAX(seq, %s) '
+                'WHERE name = %s',
+                [last, model._meta.db_table],
+            )
+            if not cursor.rowcount:
+                cursor.execute(
+                    'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                    [model._meta.db_table, last],
+                )
+        elif connection.vendor == 'mysql':
+            # AUTO_INCREMENT не опускается ниже MAX(id) + 1 сам.
+            cursor.execute(
+                f'ALTER TABLE {table} AUTO_INCREMENT = {int(last) + 1}'
+            )
+
+
+class Importer:
+    """Загружает выгрузку export пачками с возможностью продолжить.
+
+    После каждой пачки в файл состояния пишется позиция во входном
+    файле, поэтому прерванный импорт продолжается с места остановки.
+    Строки, уже попавшие в базу (пачка закоммичена, а состояние не
+    успело записаться), распознаются по id и пропускаются. Сигналы
+    при такой вставке не работают: счётчики, ленты подписок, поиск
+    и ссылки на файлы восстанавливает finish().
+    """
+
+    def __init__(self, path, state_path=None, media_dir=None,
+                 batch_size=2000):
+        self.path = path
+        self.state_path = state_path or f'{path}.state.json'
+        self.media_dir = media_dir
+        self.batch_size = batch_size
+        self.storage = Post._meta.get_field('image').storage
+        self.state = self.load_state()
+
+    def load_state(self):
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as state:
+            return json.load(state)
+
+    def save_state(self):
+        temporary = f'{self.state_path}.tmp'
+        with open(temporary, 'w') as state:
+            json.dump(self.state, state)
+        os.replace(temporary, self.state_path)
+
+    def run(self):
+        """Возвращает число вставленных строк по моделям."""
+        if self.state and self.state['finished']:
+            raise TransferError(
+                f'Импорт уже завершён; удалите {self.state_path}, '
+                'чтобы загрузить файл ещё раз'
+            )
+        with open_file(self.path, 'r') as source:
+            header = json.loads(source.readline())
+            if header.get('format') != FORMAT:
+                raise TransferError('Файл не является выгрузкой export')
+            if header.get('version') != VERSION:
+                raise TransferError(
+                    f'Неподдерживаемая версия выгрузки {header["version"]}'
+                )
+            if self.state is None:
+                self.start(header['ids'], source.tell())
+            else:
+                source.seek(self.state['position'])
+            self.maps = {
+                name: IdMap(offset)
+                for name, offset in self.state['offsets'].items()
+            }
+            for model, records, end in self.batches(source):
+                with transaction.atomic():
+                    inserted = self.insert(model, records)
+                self.state['position'] = end
+                name = model._meta.model_name
+                self.state['inserted'][name] = (
+                    self.state['inserted'].get(name, 0) + inserted
+                )
+                self.save_state()
+        self.finish()
+        return self.state['inserted']
+
+    def start(self, ranges, position):
+        """Выбирает сдвиги id и сразу занимает под импорт их диапазоны.
+
+        Счётчик id каждой модели переносится за конец её диапазона
+        до первой вставки: иначе строки, которые приложение создаёт
+        во время импорта, заняли бы id ещё не загруженных строк, и те
+        были бы пропущены как уже загруженные.
+        """
+        offsets = {}
+        for name, model in MODELS.items():
+            bounds = ranges.get(name)
+            ids = IdMap.choose(model, bounds)
+            if bounds is not None:
+                reserve_ids(model, ids(bounds[1]))
+            offsets[name] = ids.offset
+        self.state = {
+            'position': position,
+            'offsets': offsets,
+            'ranges': ranges,
+            'inserted': {},
+            'finished': False,
+        }
+        self.save_state()
+
+    def batches(self, source):
+        """Пачки подряд идущих строк одной модели.
+
+        Вместе с пачкой отдаётся позиция сразу после её последней
+        строки: с неё продолжится прерванный импорт.
+        """
+        model, records, end = None, [], source.tell()
+        while True:
+            line = source.readline()
+            if not line:
+                break
+            record = json.loads(line)
+            current = MODELS[record['model']]
+            if records and current is not model:
+                yield model, records, end
+                records = []
+            model = current
+            records.append(record)
+            end = source.tell()
+            if len(records) >= self.batch_size:
+                yield model, records, end
+                records = []
+        if records:
+            yield model, records, end
+
+    def insert(self, model, records):
+        ids = self.maps[model._meta.model_name]
+        for record in records:
+            record['id'] = ids(record['id'])
+        existing = set(
+            model.objects.filter(pk__in=[record['id'] for record in records])
+            .values_list('pk', flat=True)
+        )
+        records = [
+            record for record in records if record['id'] not in existing
+        ]
+        if model in NATURAL_KEYS:
+            self.check_conflicts(model, records)
+        fields = FIELDS[model]
+        columns = [model._meta.get_field(field) for field in fields]
+        images = Counter()
+        rows = []
+        for record in records:
+            values = [
+                self.convert(field, record[field.name]) for field in columns
+            ]
+            if model is Post and record['image']:
+                name = self.restore_image(record['image'])
+                values[fields.index('image')] = name
+                images[name] += 1
+            rows.append([
+                record['id'], *values, *CONSTANTS.get(model, {}).values()
+            ])
+        inserted = write_rows(
+            model, ['id', *fields, *CONSTANTS.get(model, {})], rows,
+            self.batch_size,
+        )
+        for name, count in images.items():
+            media.retain(name, count)
+        return inserted
+
+    def check_conflicts(self, model, records):
+        field = NATURAL_KEYS[model]
+        taken = list(
+            model.objects.filter(**{
+                f'{field}__in': [record[field] for record in records]
+            }).values_list(field, flat=True)[:10]
+        )
+        if taken:
+            raise TransferError(
+                f'{model._meta.verbose_name_plural} уже есть в базе: '
+                f'{", ".join(sorted(taken))}'
+            )
+
+    def convert(self, field, value):
+        if value is None:
+            return None
+        if isinstance(field, models.ForeignKey):
+            return self.maps[field.related_model._meta.model_name](value)
+        if isinstance(field, models.DateTimeField):
+            return parse_datetime(value)
+        return value
+
+    def restore_image(self, name):
+        """Кладёт файл из media_dir в хранилище и возвращает его имя.
+
+        Файл, который уже есть в хранилище, не копируется. Хранилище
+        адресует файлы по содержимому, поэтому имя скопированного может
+        поменяться (например, у файлов из плоского каталога posts/).
+        """
+        if self.storage.exists(name):
+            return name
+        path = self.media_dir and safe_join(self.media_dir, name)
+        if not path or not os.path.exists(path):
+            logger.warning('Нет файла изображения %s', name)
+            return name
+        field = Post._meta.get_field('image')
+        with open(path, 'rb') as image:
+            return self.storage.save(
+                field.generate_filename(None, os.path.basename(name)),
+                File(image),
+            )
+
+    def imported_range(self, name):
+        bounds = self.state['ranges'].get(name)
+        if bounds is None:
+            return None
+        ids = self.maps[name]
+        return ids(bounds[0]), ids(bounds[1])
+
+    def finish(self):
+        """Восстанавливает то, что при обычном сохранении делают сигналы."""
+        users = self.imported_range('user')
+        posts = self.imported_range('post')
+        with transaction.atomic():
+            if posts:
+                counts = (
+                    Comment.objects.filter(post=OuterRef('pk'))
+                    .order_by().values('post')
+                    .annotate(total=Count('pk')).values('total')
+                )
+                Post.objects.filter(pk__range=posts).update(
+                    comments_count=Coalesce(
+                        Subquery(counts, output_field=IntegerField()), 0
+                    )
+                )
+            if users:
+                TimelineEntry.objects.filter(
+                    user__gte=users[0], user__lte=users[1]
+                ).delete()
+                fill_timeline(*users)
+                stats.reconcile(User.objects.filter(pk__range=users))
+            if posts:
+                search.rebuild_index(posts)
+        page_cache.invalidate(page_cache.GLOBAL_SCOPE)
+        self.state['finished'] = True
+        self.save_state()
@@ -10,6 +10,7 @@ urlpatterns = [
     path('groups/', views.group_list_view, name='group_list'),
     path('group/<slug:slug>/', views.group_post, name='group_posts'),
     path('new/', views.new_post, name='new_post'),
+    path('search/', views.search, name='search'),
     path('<str:username>/', views.profile, name='profile'),
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path(
@@ -17,6 +18,11 @@ urlpatterns = [
         views.post_edit,
         name='post_edit'
     ),
+    path(
+        '<str:username>/<int:post_id>/comments/',
+        views.comments,
+        name='comments'
+    ),
     path(
         '<str:username>/<int:post_id>/comment/',
         views.add_comment,
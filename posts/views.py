@@ -1,33 +1,56 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
 
-from yatube.settings import PER_PAGE
+from yatube.metrics import query_budget
 
+from .comments import comment_page
+from .feeds import follow_feed
 from .forms import CommentForm, PostForm
+from .images import set_placeholder
 from .models import Follow, Group, Post, User
-
-
+from .page_cache import (cache_anonymous_page, conditional_page, group_scopes,
+                         index_scopes, post_scopes, profile_scopes)
+from .pagination import paginate
+from .search import search_page
+from .stats import get_stats
+from .thumbnails import prefetch as prefetch_thumbnails
+from .thumbnails import schedule as schedule_thumbnail
+
+
+@query_budget(5)
+@conditional_page(index_scopes)
+@cache_anonymous_page(index_scopes)
 def index(request):
     latest = (Post.objects.select_related('group')
               .select_related('author').all())
-    paginator = Paginator(latest, PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(request, latest)
     return render(request, 'index.html', {'page': page})
 
 
+@query_budget(5)
+def search(request):
+    query = request.GET.get('q', '').strip()
+    page = search_page(query, request.GET.get('cursor')) if query else None
+    context = {
+        'query': query,
+        'page': page,
+    }
+    return render(request, 'search.html', context)
+
+
 def group_list_view(request):
     groups = Group.objects.all()
     return render(request, 'group_list.html', {'groups': groups})
 
 
+@query_budget(6)
+@conditional_page(group_scopes)
+@cache_anonymous_page(group_scopes)
 def group_post(request, slug):
     group = get_object_or_404(Group, slug=slug)
     posts = group.posts.select_related('author').all()
-    paginator = Paginator(posts, PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(request, posts)
     context = {
         'group': group,
         'page': page,
@@ -45,19 +68,25 @@ def new_post(request):
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        set_placeholder(post)
+        with transaction.atomic():
+            post.save()
+        schedule_thumbnail(post)
         return redirect('posts:index')
 
     return render(request, 'new_post.html', {'form': form})
 
 
+@query_budget(12)
+@conditional_page(profile_scopes)
+@cache_anonymous_page(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    following_number = author.follower.all().count()
-    follower_number = author.following.all().count()
-    author_posts = author.posts.all()
-
-    user_post_quantity = author.posts.all().count()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    author_stats = get_stats(author)
+    author_posts = author.posts.select_related('group')
 
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -67,26 +96,29 @@ def profile(request, username):
     else:
         following = False
 
-    paginator = Paginator(author_posts, PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(request, author_posts)
     context = {
         'page': page,
         'author': author,
-        'quantity': user_post_quantity,
-        'following_number': following_number,
-        'follower_number': follower_number,
+        'quantity': author_stats.posts_count,
+        'following_number': author_stats.following_count,
+        'follower_number': author_stats.followers_count,
         'following': following,
     }
     return render(request, 'profile.html', context)
 
 
+@query_budget(10)
+@conditional_page(post_scopes)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, id=post_id, author__username=username)
-    user_post_quantity = Post.objects.filter(author__username=username).count()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        id=post_id,
+        author__username=username
+    )
+    prefetch_thumbnails([post])
     author = post.author
-    following_number = author.follower.all().count()
-    follower_number = author.following.all().count()
+    author_stats = get_stats(author)
 
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -97,15 +129,16 @@ def post_view(request, username, post_id):
         following = False
 
     form = CommentForm()
-    comments = post.comments.all()
+    comments = comment_page(post.pk)
     context = {
         'post': post,
         'author': author,
-        'quantity': user_post_quantity,
+        'quantity': author_stats.posts_count,
         'form': form,
-        'comments': comments,
-        'following_number': following_number,
-        'follower_number': follower_number,
+        'comments': comments.object_list,
+        'comments_page': comments,
+        'following_number': author_stats.following_count,
+        'follower_number': author_stats.followers_count,
         'following': following,
     }
     return render(request, 'post.html', context)
@@ -127,7 +160,13 @@ def post_edit(request, username, post_id):
         instance=post
     )
     if form.is_valid():
-        post.save()
+        fields = list(PostForm.Meta.fields)
+        if 'image' in form.changed_data:
+            set_placeholder(post)
+            fields.append('image_placeholder')
+        post.save(update_fields=fields)
+        if 'image' in form.changed_data:
+            schedule_thumbnail(post)
         return redirect(
             'posts:post',
             username=username,
@@ -136,6 +175,20 @@ def post_edit(request, username, post_id):
     return render(request, 'new_post.html', {'form': form, 'post': post})
 
 
+@query_budget(4)
+@conditional_page(post_scopes)
+def comments(request, username, post_id):
+    post = get_object_or_404(
+        Post.objects.only('pk'), id=post_id, author__username=username
+    )
+    context = {
+        'comments': comment_page(post.pk, request.GET.get('cursor')),
+        'username': username,
+        'post_id': post.pk,
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
 @login_required
 def add_comment(request, username, post_id):
     redirect_to_post_page = redirect(
@@ -157,15 +210,13 @@ def add_comment(request, username, post_id):
     return redirect_to_post_page
 
 
+@query_budget(10)
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(request, follow_feed(request.user))
     context = {
         'page': page,
-        'paginator': paginator,
+        'paginator': page.paginator,
     }
     return render(request, "follow.html", context)
 
@@ -180,17 +231,21 @@ def profile_follow(request, username):
     if request.user == author:
         return redirect_to_profile
 
-    Follow.objects.get_or_create(
-        user=request.user,
-        author=author
-    )
+    with transaction.atomic():
+        Follow.objects.get_or_create(
+            user=request.user,
+            author=author
+        )
     return redirect_to_profile
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    get_object_or_404(Follow, user=request.user, author=author).delete()
+    with transaction.atomic():
+        get_object_or_404(
+            Follow, user=request.user, author=author
+        ).delete()
     return redirect(
         'posts:profile',
         username=username,
@@ -0,0 +1,315 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.cache.backends.locmem import LocMemCache
+
+GENERATION_KEY = 'two_tier:generation'
+
+NAMESPACE_KEY = 'two_tier:namespace:{}'
+
+_MISSING = object()
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class LocalStore:
+    """Ограниченный по размеру LRU в памяти процесса.
+
+    Общий для всех потоков процесса, как у LocMemCache.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generation = None
+        self.namespaces = {}
+        self.checked_at = 0
+        self.lock = threading.Lock()
+        self.counters = {
+            'local_hits': 0,
+            'local_misses': 0,
+            'shared_hits': 0,
+            'shared_misses': 0,
+        }
+
+    def get(self, key, now):
+        with self.lock:
+            entry = self.entries.get(key)
+            if (entry is None or entry[1] <= now
+                    or entry[3] != self.namespaces.get(entry[2])):
+                self.entries.pop(key, None)
+                self.counters['local_misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.counters['local_hits'] += 1
+            return entry
+
+    def set(self, key, value, expires_at, namespace):
+        with self.lock:
+            self.entries[key] = (
+                value, expires_at, namespace, self.namespaces.get(namespace)
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.namespaces.clear()
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+
+def namespace(key):
+    """Пространство ключа — часть до первого двоеточия."""
+    return str(key).split(':', 1)[0]
+
+
+def _get_store(name, max_entries):
+    with _stores_lock:
+        if name not in _stores:
+            _stores[name] = LocalStore(max_entries)
+        return _stores[name]
+
+
+class TwoTierCache(BaseCache):
+    """Кэш в памяти процесса поверх общего бэкенда.
+
+    Значения читаются сначала из локального LRU с коротким сроком
+    жизни, затем из общего кэша (файлового, БД, Redis). Запись идёт
+    в оба уровня. delete и incr увеличивают номер поколения
+    пространства ключа (части до первого двоеточия, например
+    page_gen), clear — общий номер. Процессы сверяют номера не реже
+    раза в GENERATION_CHECK_INTERVAL секунд и перестают доверять
+    локальным копиям только из изменившихся пространств, поэтому
+    частые incr счётчиков не выбрасывают закэшированные страницы.
+    Обычный set виден другим процессам не позже чем через
+    LOCAL_TIMEOUT секунд.
+
+    Параметры OPTIONS: SHARED — алиас общего кэша в CACHES,
+    LOCAL_MAX_ENTRIES, LOCAL_TIMEOUT, GENERATION_CHECK_INTERVAL.
+    """
+
+    def __init__(self, location, params):
+        options = params.get('OPTIONS', {})
+        super().__init__({
+            key: value for key, value in params.items() if key != 'OPTIONS'
+        })
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+        self.check_interval = options.get('GENERATION_CHECK_INTERVAL', 1)
+        self.store = _get_store(
+            location or self.shared_alias,
+            options.get('LOCAL_MAX_ENTRIES', 1000),
+        )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _local_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def _local_expiry(self, timeout, now):
+        if timeout is None:
+            return now + self.local_timeout
+        return now + min(timeout, self.local_timeout)
+
+    def _sync_generation(self, now):
+        store = self.store
+        if now - store.checked_at < self.check_interval:
+            return
+        names = list(store.namespaces)
+        keys = [NAMESPACE_KEY.format(name) for name in names]
+        values = self.shared.get_many([GENERATION_KEY, *keys])
+        generation = values.get(GENERATION_KEY)
+        if generation != store.generation:
+            store.clear()
+            store.generation = generation
+        else:
+            with store.lock:
+                for name, key in zip(names, keys):
+                    store.namespaces[name] = values.get(key)
+        store.checked_at = now
+
+    def _namespace(self, key):
+        """Пространство ключа; его номер поколения читается один раз."""
+        name = namespace(key)
+        if name not in self.store.namespaces:
+            generation = self.shared.get(NAMESPACE_KEY.format(name))
+            with self.store.lock:
+                self.store.namespaces.setdefault(name, generation)
+        return name
+
+    def _incr_generation(self, key):
+        try:
+            return self.shared.incr(key)
+        except ValueError:
+            generation = time.time()
+            self.shared.set(key, generation, None)
+            return generation
+
+    def _bump_namespaces(self, keys):
+        for name in {namespace(key) for key in keys}:
+            generation = self._incr_generation(NAMESPACE_KEY.format(name))
+            with self.store.lock:
+                self.store.namespaces[name] = generation
+
+    def _bump_generation(self):
+        generation = self._incr_generation(GENERATION_KEY)
+        self.store.clear()
+        self.store.generation = generation
+        self.store.checked_at = time.monotonic()
+
+    def get(self, key, default=None, version=None):
+        now = time.monotonic()
+        self._sync_generation(now)
+        local_key = self._local_key(key, version)
+        entry = self.store.get(local_key, now)
+        if entry is not None:
+            return entry[0]
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self.store.count('shared_misses')
+            return default
+        self.store.count('shared_hits')
+        self.store.set(
+            local_key, value, now + self.local_timeout, self._namespace(key)
+        )
+        return value
+
+    def get_many(self, keys, version=None):
+        now = time.monotonic()
+        self._sync_generation(now)
+        found = {}
+        missing = []
+        for key in keys:
+            entry = self.store.get(self._local_key(key, version), now)
+            if entry is not None:
+                found[key] = entry[0]
+            else:
+                missing.append(key)
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            self.store.count('shared_hits', len(shared))
+            self.store.count('shared_misses', len(missing) - len(shared))
+            for key, value in shared.items():
+                self.store.set(
+                    self._local_key(key, version), value,
+                    now + self.local_timeout, self._namespace(key)
+                )
+            found.update(shared)
+        return found
+
+    def _store_locally(self, data, timeout, version):
+        now = time.monotonic()
+        for key, value in data.items():
+            local_key = self._local_key(key, version)
+            if timeout is not None and timeout <= 0:
+                self.store.delete(local_key)
+            else:
+                self.store.set(
+                    local_key, value, self._local_expiry(timeout, now),
+                    self._namespace(key)
+                )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        self.shared.set(key, value, timeout, version=version)
+        self._store_locally({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        failed = self.shared.set_many(data, timeout, version=version)
+        self._store_locally(
+            {key: value for key, value in data.items() if key not in failed},
+            timeout, version
+        )
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._store_locally({key: value}, timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._bump_namespaces([key])
+        return value
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self._bump_namespaces([key])
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(keys, version=version)
+        self._bump_namespaces(keys)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def clear(self):
+        self.shared.clear()
+        self._bump_generation()
+
+    def stats(self):
+        """Попадания и промахи по уровням с момента старта процесса."""
+        with self.store.lock:
+            return dict(self.store.counters)
+
+
+def is_process_local(alias='default'):
+    """Видит ли кэш alias только текущий процесс.
+
+    У TwoTierCache проверяется общий уровень: локальный есть всегда.
+    """
+    config = settings.CACHES[alias]
+    if config['BACKEND'] == 'yatube.cache.TwoTierCache':
+        alias = config.get('OPTIONS', {}).get('SHARED', 'shared')
+    return isinstance(caches[alias], LocMemCache)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Предупреждает, что общий уровень TwoTierCache не общий.
+
+    С LocMemCache у каждого процесса свой кэш: номера поколений не
+    доходят до других процессов, поэтому страничный кэш и ответы 304
+    в этом случае выключены (см. PAGE_CACHE_SINGLE_PROCESS).
+    """
+    warnings = []
+    for alias, config in settings.CACHES.items():
+        if config['BACKEND'] != 'yatube.cache.TwoTierCache':
+            continue
+        if is_process_local(alias):
+            shared = config.get('OPTIONS', {}).get('SHARED', 'shared')
+            warnings.append(checks.Warning(
+                f'Общий кэш «{shared}» для «{alias}» — LocMemCache, '
+                'процессы приложения не видят изменений друг друга',
+                hint='Укажите CACHE_BACKEND и CACHE_LOCATION в .env',
+                id='yatube.W001',
+            ))
+    return warnings
@@ -0,0 +1,210 @@
+import contextvars
+import logging
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+_aggregate = {}
+_aggregate_lock = threading.Lock()
+
+UNRESOLVED = '<unresolved>'
+
+
+class RequestMetrics:
+    """Запросы к базе и время рендеринга одного HTTP-запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.duplicates = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.rendering = False
+        self.budget = None
+        self._seen = set()
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return time.perf_counter() - self.started
+
+    def add_query(self, sql, params, many, duration):
+        key = (sql, None if many else repr(params))
+        if key in self._seen:
+            self.duplicates += 1
+        self._seen.add(key)
+        self.queries.append(sql)
+        self.db_time += duration
+
+    def over_budget(self):
+        return self.budget is not None and self.query_count > self.budget
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.query_count} queries, '
+            f'{self.duplicates} duplicates"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'total;dur={self.total_time * 1000:.1f}',
+        ])
+
+
+def current():
+    """Метрики текущего запроса или None вне MetricsMiddleware."""
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, params, many, time.perf_counter() - start)
+
+
+def record(view_name, metrics):
+    with _aggregate_lock:
+        stats = _aggregate.setdefault(view_name, {
+            'requests': 0,
+            'queries': 0,
+            'max_queries': 0,
+            'duplicates': 0,
+            'db_time': 0.0,
+            'template_time': 0.0,
+            'total_time': 0.0,
+            'over_budget': 0,
+        })
+        stats['requests'] += 1
+        stats['queries'] += metrics.query_count
+        stats['max_queries'] = max(stats['max_queries'], metrics.query_count)
+        stats['duplicates'] += metrics.duplicates
+        stats['db_time'] += metrics.db_time
+        stats['template_time'] += metrics.template_time
+        stats['total_time'] += metrics.total_time
+        stats['over_budget'] += metrics.over_budget()
+
+
+def snapshot():
+    """Суммы по имени вью с момента старта процесса."""
+    with _aggregate_lock:
+        return {name: dict(stats) for name, stats in _aggregate.items()}
+
+
+def reset():
+    with _aggregate_lock:
+        _aggregate.clear()
+
+
+def query_budget(limit):
+    """Объявляет, сколько запросов к базе вью может сделать.
+
+    Превышение пишется в лог, а при QUERY_BUDGET_STRICT (его включает
+    тестовый раннер) роняет запрос, как assert_query_budget.
+    """
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def assert_query_budget(response, budget=None):
+    """Падает, если ответ потребовал больше запросов, чем положено.
+
+    Работает с ответами тестового клиента и в pytest, и в TestCase;
+    без budget берётся значение из @query_budget вью.
+    """
+    metrics = getattr(response, 'metrics', None)
+    assert metrics is not None, 'Ответ прошёл мимо MetricsMiddleware'
+    budget = budget if budget is not None else metrics.budget
+    assert budget is not None, 'У вью не объявлен бюджет запросов'
+    assert metrics.query_count <= budget, (
+        f'{metrics.query_count} запросов при бюджете {budget}:\n'
+        + '\n'.join(metrics.queries)
+    )
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        # Вложенные шаблоны (карточки записей) уже учтены во внешнем.
+        if metrics is None or metrics.rendering:
+            return super().render(context, request)
+        metrics.rendering = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.rendering = False
+            metrics.template_time += time.perf_counter() - start
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Шаблонный бэкенд Django, замеряющий время рендеринга."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+class MetricsMiddleware:
+    """Считает запросы к базе, их время и время шаблонов для каждой вью.
+
+    Итог уходит в заголовок Server-Timing, в сводку процесса
+    (snapshot) и в response.metrics. Превышение бюджета из
+    @query_budget пишется в лог, а при QUERY_BUDGET_STRICT ещё
+    и поднимает AssertionError.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else UNRESOLVED
+        if metrics.over_budget():
+            logger.warning(
+                '%s: %s запросов при бюджете %s',
+                view_name, metrics.query_count, metrics.budget
+            )
+        record(view_name, metrics)
+        response['Server-Timing'] = metrics.server_timing()
+        response.metrics = metrics
+        if settings.QUERY_BUDGET_STRICT and metrics.budget is not None:
+            assert_query_budget(response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.budget = getattr(view_func, 'query_budget', None)
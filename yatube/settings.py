@@ -33,6 +33,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -44,11 +45,15 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 
+TEST_RUNNER = 'yatube.test_runner.TestRunner'
+
+QUERY_BUDGET_STRICT = False
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.metrics.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -123,6 +128,10 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+FILE_UPLOAD_HANDLERS = [
+    'posts.images.LimitedUploadHandler',
+]
+
 LOGIN_URL = "/auth/login/"
 LOGIN_REDIRECT_URL = "posts:index"
 # LOGOUT_REDIRECT_URL = "index"
@@ -133,8 +142,75 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'yatube.cache.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+            'GENERATION_CHECK_INTERVAL': 1,
+        },
+    },
+    'shared': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    },
 }
 
 PER_PAGE = 10
+
+COMMENTS_PER_PAGE = 50
+
+KEYSET_PAGINATION = False
+
+ESTIMATED_COUNT_THRESHOLD = 100000
+
+TIMELINE_FANOUT_LIMIT = 1000
+
+TIMELINE_BACKFILL = 500
+
+FOLLOW_MERGE_MAX_AUTHORS = 30
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+# Разрешает страничный кэш и ответы 304 при общем кэше в памяти
+# процесса; годится, только если приложение работает одним процессом.
+PAGE_CACHE_SINGLE_PROCESS = False
+
+POST_THUMBNAIL_ASYNC = True
+
+POST_IMAGE_WIDTHS = (480, 960)
+
+POST_IMAGE_FORMATS = ('WEBP', 'JPEG')
+
+POST_IMAGE_PLACEHOLDER_SIZE = 16
+
+POST_IMAGE_MAX_BYTES = 20 * 1024 * 1024
+
+POST_IMAGE_MAX_PIXELS = 25 * 1000 * 1000
+
+POST_IMAGE_MAX_DECODED_PIXELS = 12 * 1000 * 1000
+
+POST_IMAGE_MAX_SIDE = 2560
+
+JOBS_LEASE = 5 * 60
+
+JOBS_MAX_ATTEMPTS = 5
+
+JOBS_RETRY_DELAY = 10
+
+JOBS_RETRY_MAX_DELAY = 60 * 60
+
+JOBS_POLL_INTERVAL = 1.0
+
+STAMPEDE_BETA = 1.0
+
+STAMPEDE_LEASE = 10
+
+STAMPEDE_STALE_TIMEOUT = 60
+
+STAMPEDE_POLL_INTERVAL = 0.05
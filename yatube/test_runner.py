@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Запускает тесты с QUERY_BUDGET_STRICT.
+
+    Любой ответ тестового клиента, превысивший @query_budget своей
+    вью, роняет тест, даже если тест не проверяет бюджет явно.
+    Тесты идут в одном процессе, поэтому страничный кэш работает
+    и на LocMemCache (PAGE_CACHE_SINGLE_PROCESS).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.QUERY_BUDGET_STRICT = True
+        settings.PAGE_CACHE_SINGLE_PROCESS = True